@@ -0,0 +1,262 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Drives many headless sessions of ``streamlit_app.py`` at once through
+Streamlit's app-testing harness. Every session fills in the form with its
+own store, submits it, turns on a document preview and resubmits with a
+different refund timeframe, ``--rounds`` times. Sessions run on threads in
+one process, as a Streamlit server runs them, so they compete for the same
+GIL, caches and memory.
+
+Each step (``--sessions 1,10,50,100,200``) runs in a fresh subprocess, so
+its memory numbers start from the same baseline. Reported per step:
+reruns/s, rerun latency percentiles (overall and per interaction), and
+resident memory per session (RSS growth after the sessions were created
+and used, divided by their number). Throughput has saturated at the first
+step where adding sessions raised reruns/s by less than ``--saturation``.
+
+    python benchmarks/bench_app_sessions.py --sessions 1,10,50,100,200 -o sessions.json
+
+The harness always reruns the whole script: preview toggles, which a real
+browser session reruns as a single fragment, are an upper bound here.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_app.py")
+sys.path.insert(0, ROOT)
+
+DOCUMENTS = ["refund_policy", "privacy_policy", "terms_conditions"]
+JURISDICTIONS = ["Dehradun, Uttarakhand", "Mumbai, Maharashtra", "Bengaluru, Karnataka",
+                 "Jaipur, Rajasthan", "Kolkata, West Bengal"]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def form_values(n, rng):
+    return {
+        "Company Name": f"Store {n}",
+        "Website URL like example.com": f"store{n}.example.com",
+        "Jurisdiction (e.g., Dehradun, Uttarakhand)": rng.choice(JURISDICTIONS),
+        "Company Contact Email": f"support@store{n}.example.com",
+        "Privacy Compliance Email": f"privacy@store{n}.example.com",
+    }
+
+
+def patch_app_test():
+    """Let app-test sessions run concurrently, like sessions of one server.
+
+    AppTest installs a fresh mock Runtime for every run and removes it
+    afterwards, which breaks any run still in flight on another thread, and
+    compiles the script again for every run. A server has one Runtime and
+    one script cache shared by all its sessions, so install those for the
+    whole process instead. AppTest also waits for a run by polling every
+    millisecond; with hundreds of sessions the polling alone would starve
+    the scripts, so wait on the script thread instead.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config, logger
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+    poll = local_script_runner.require_widgets_deltas
+
+    def wait_for_run(runner, timeout=3):
+        runner._script_thread.join(timeout)
+        if not runner.script_stopped():
+            # Stops the runner and raises the usual timeout error
+            poll(runner, 0)
+
+    local_script_runner.require_widgets_deltas = wait_for_run
+    # Set once rather than patched and restored around every run
+    config.set_option("global.appTest", True)
+    # Widgets set from outside a script run warn about a missing ScriptRunContext
+    logger.set_log_level("error")
+    app_test.patch_config_options = lambda options: contextlib.nullcontext()
+
+
+class Session:
+    """One headless app session and the latencies of its reruns."""
+
+    def __init__(self, n, seed):
+        from streamlit.testing.v1 import AppTest
+
+        self.n = n
+        self.rng = random.Random(seed * 100_003 + n)
+        self.app = AppTest.from_file(APP, default_timeout=600)
+        self.latencies = []
+        self.errors = 0
+
+    def rerun(self, kind):
+        started = time.perf_counter()
+        self.app.run()
+        self.latencies.append((kind, time.perf_counter() - started))
+        if self.app.exception:
+            self.errors += 1
+
+    def open(self):
+        self.rerun("initial")
+
+    def interact(self, rounds):
+        app = self.app
+        for widget in app.text_input:
+            value = form_values(self.n, self.rng).get(widget.label)
+            if value is not None:
+                widget.input(value)
+        for _ in range(rounds):
+            app.button[0].click()
+            self.rerun("generate")
+            app.toggle(key=f"preview_{self.rng.choice(DOCUMENTS)}").set_value(True)
+            self.rerun("preview")
+            app.slider[0].set_value(self.rng.randint(1, 30))
+            app.button[0].click()
+            self.rerun("regenerate")
+
+
+def run_step(sessions, rounds, seed):
+    """Load ``sessions`` concurrent sessions in this process and return the step's results."""
+    patch_app_test()
+    # A throwaway session pays for the imports, template loading and script
+    # compilation that all sessions share
+    Session(-1, seed).open()
+    gc.collect()
+    baseline = rss_bytes()
+    pool = ThreadPoolExecutor(max_workers=sessions)
+    clients = [Session(n, seed) for n in range(sessions)]
+    # Opening the app is not part of the measured load
+    list(pool.map(Session.open, clients))
+
+    barrier = threading.Barrier(sessions)
+
+    def drive(client):
+        barrier.wait()
+        client.interact(rounds)
+
+    started = time.perf_counter()
+    list(pool.map(drive, clients))
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    gc.collect()
+    memory = rss_bytes() - baseline
+
+    by_kind = {}
+    for client in clients:
+        for kind, seconds in client.latencies:
+            if kind != "initial":
+                by_kind.setdefault(kind, []).append(seconds)
+    every = sorted(s for values in by_kind.values() for s in values)
+    result = {
+        "sessions": sessions,
+        "reruns": len(every),
+        "errors": sum(client.errors for client in clients),
+        "seconds": elapsed,
+        "reruns_per_second": len(every) / elapsed,
+        "p50_ms": percentile(every, 50) * 1000,
+        "p90_ms": percentile(every, 90) * 1000,
+        "p99_ms": percentile(every, 99) * 1000,
+        "rss_per_session_bytes": memory / sessions,
+        "interactions": {},
+    }
+    for kind, values in by_kind.items():
+        values.sort()
+        result["interactions"][kind] = {
+            "p50_ms": percentile(values, 50) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "mean_ms": statistics.mean(values) * 1000,
+        }
+    return result
+
+
+def run_isolated(sessions, rounds, seed):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--step", str(sessions),
+         "--rounds", str(rounds), "--seed", str(seed)],
+        cwd=ROOT, check=True, stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, PYTHONHASHSEED=str(seed))).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def saturation_point(results, threshold):
+    """Sessions of the first step that gained less than ``threshold`` reruns/s."""
+    for previous, current in zip(results, results[1:]):
+        if current["reruns_per_second"] < previous["reruns_per_second"] * (1 + threshold):
+            return previous["sessions"]
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="1,10,50,100,200",
+                        help="comma-separated numbers of concurrent sessions, one step each")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="generate/preview/regenerate rounds per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--saturation", type=float, default=0.1,
+                        help="minimum relative reruns/s gain of a step (default: 0.1)")
+    parser.add_argument("-o", "--output", default=None, help="write the results as JSON here")
+    parser.add_argument("--step", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.step is not None:
+        # Child process: one step, results as the last line of stdout
+        print(json.dumps(run_step(args.step, args.rounds, args.seed)))
+        return
+
+    results = []
+    print(f"{'sessions':>8} {'reruns/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'MiB/session':>12} {'errors':>7}")
+    for sessions in sorted({int(n) for n in args.sessions.split(",")}):
+        result = run_isolated(sessions, args.rounds, args.seed)
+        results.append(result)
+        print(f"{sessions:>8} {result['reruns_per_second']:>9.1f} {result['p50_ms']:>8.1f} "
+              f"{result['p90_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+              f"{result['rss_per_session_bytes'] / 2**20:>12.2f} {result['errors']:>7}")
+
+    saturated = saturation_point(results, args.saturation)
+    if saturated is None:
+        print("throughput still rising at the largest step")
+    else:
+        print(f"throughput saturates at about {saturated} sessions "
+              f"({os.cpu_count()} CPUs)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "rounds": args.rounds, "seed": args.seed,
+                       "saturated_at": saturated, "steps": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
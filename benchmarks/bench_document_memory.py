@@ -0,0 +1,82 @@
+"""Memory held by many stores' documents: full strings vs. compact Documents.
+
+Builds every document for ``--stores`` distinct stores as ``Document``
+objects (template reference plus substituted values) and measures the
+traced memory they keep alive. The same set as fully rendered strings
+would need several GB for 100k stores, so strings are measured for a
+``--sample`` of stores and scaled up; each string is an independent copy,
+so that cost is linear in the number of stores.
+
+    python benchmarks/bench_document_memory.py --stores 100000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecomlegalgen.documents import DOCUMENTS, build_document  # noqa: E402
+
+
+def store_inputs(n):
+    return {
+        "company_name": f"Store {n}",
+        "company_contact_email": f"support@store{n}.com",
+        "privacy_compliance_email": f"privacy@store{n}.com",
+        "website_url": f"store{n}.com",
+        "jurisdiction": "Dehradun, Uttarakhand",
+        "refund_timeframe": 10,
+        "last_updated": "January 01, 2025",
+    }
+
+
+def held_bytes(build, stores):
+    """Traced bytes still allocated after building documents for ``stores`` stores."""
+    # Load and compile the templates outside of the measurement
+    build(store_inputs(-1))
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        held = [build(store_inputs(n)) for n in range(stores)]
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del held
+    return size
+
+
+def as_strings(inputs):
+    # Materialized rather than through render_document, whose cache would
+    # keep references of its own
+    return [str(build_document(name, inputs)) for name in DOCUMENTS]
+
+
+def as_documents(inputs):
+    return [build_document(name, inputs) for name in DOCUMENTS]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stores", type=int, default=100_000)
+    parser.add_argument("--sample", type=int, default=2_000,
+                        help="stores actually rendered to strings (default: 2000)")
+    args = parser.parse_args(argv)
+
+    sample = min(args.sample, args.stores)
+    strings = held_bytes(as_strings, sample) / sample * args.stores
+    documents = held_bytes(as_documents, args.stores)
+
+    print(f"{args.stores:,} stores x {len(DOCUMENTS)} documents")
+    print(f"{'strings':<10} {strings / 2**20:>12,.1f} MiB  (scaled from {sample:,} stores)")
+    print(f"{'Document':<10} {documents / 2**20:>12,.1f} MiB")
+    print(f"{'ratio':<10} {strings / documents:>12,.0f}x  "
+          f"({documents / args.stores:,.0f} B per store, mostly its own values)")
+
+
+if __name__ == "__main__":
+    main()
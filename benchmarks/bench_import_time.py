@@ -0,0 +1,65 @@
+"""Import-time guard for the Streamlit-free core.
+
+Runs ``python -X importtime -c "import <module>"`` in fresh interpreters,
+reports the best cumulative import time and fails (exit status 1) if the
+core pulls in Streamlit or exceeds ``--max-ms``.
+
+    python benchmarks/bench_import_time.py [--max-ms 100] [--compare streamlit_app]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module):
+    """Return ``{imported module: cumulative microseconds}`` for one fresh import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def best_import_ms(module, runs):
+    profiles = [import_profile(module) for _ in range(runs)]
+    return min(p[module] for p in profiles) / 1000, profiles[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="ecomlegalgen")
+    parser.add_argument("--max-ms", type=float, default=100.0,
+                        help="fail if the best cumulative import time exceeds this")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--compare", default=None,
+                        help="also report the import time of another module (e.g. streamlit_app)")
+    args = parser.parse_args(argv)
+
+    ms, profile = best_import_ms(args.module, args.runs)
+    print(f"{args.module}: {ms:.1f} ms")
+    if args.compare:
+        compare_ms, _ = best_import_ms(args.compare, args.runs)
+        print(f"{args.compare}: {compare_ms:.1f} ms")
+
+    failed = False
+    heavy = sorted(name for name in profile if name.split(".")[0] == "streamlit")
+    if heavy:
+        print(f"FAIL: {args.module} imports Streamlit ({heavy[0]})")
+        failed = True
+    if ms > args.max_ms:
+        print(f"FAIL: {args.module} import took {ms:.1f} ms (limit {args.max_ms:.0f} ms)")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
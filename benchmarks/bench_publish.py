@@ -0,0 +1,99 @@
+"""Offline throughput and rate-limit behaviour of the Shopify publisher.
+
+Publishes every document of ``--stores`` synthetic stores to an in-process
+``MockShopify`` whose responses take ``--latency`` seconds, once per
+``--concurrency`` level (a fresh mock each time, so every run creates all
+pages). Reports documents/s, API calls/s and the 429s the stores got.
+
+``--rate-limit-check`` then publishes the first ``--stores-throttled``
+stores against a tight server bucket (``--bucket-size``/``--leak-rate``),
+with and without the client-side token buckets, to show how many calls
+each way gets throttled.
+
+    python benchmarks/bench_publish.py --stores 500 --latency 0.05 --concurrency 1,8,32,128
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ecomlegalgen.locales import format_date  # noqa: E402
+from ecomlegalgen.shopify import publish_all  # noqa: E402
+from ecomlegalgen.shopify_mock import MockShopify  # noqa: E402
+
+
+def store_jobs(stores):
+    last_updated = format_date()
+    return [(f"store{n}-com", f"store{n}.myshopify.com", "mock-token", {
+        "company_name": f"Store {n}",
+        "company_contact_email": f"support@store{n}.com",
+        "privacy_compliance_email": f"privacy@store{n}.com",
+        "website_url": f"store{n}.com",
+        "jurisdiction": "Dehradun, Uttarakhand",
+        "refund_timeframe": 10,
+        "last_updated": last_updated,
+    }, "en") for n in range(stores)]
+
+
+async def run(jobs, concurrency, connections, rate_limit=True, **mock_options):
+    async with MockShopify(**mock_options) as mock:
+        summary = await publish_all(
+            jobs, endpoint=f"http://{mock.host}:{mock.port}", concurrency=concurrency,
+            connections_per_host=connections, bucket_size=mock.bucket_size,
+            leak_rate=mock.leak_rate, rate_limit=rate_limit)
+    summary["mock"] = mock.stats()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stores", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds the mock takes to answer each call (default: 0.05)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of calls the mock fails with a 500")
+    parser.add_argument("--concurrency", default="1,8,32,128",
+                        help="comma-separated numbers of stores published at once")
+    parser.add_argument("--connections", type=int, default=None,
+                        help="connections to the mock (default: two per concurrent store)")
+    parser.add_argument("--rate-limit-check", action="store_true")
+    parser.add_argument("--stores-throttled", type=int, default=20)
+    parser.add_argument("--bucket-size", type=int, default=4)
+    parser.add_argument("--leak-rate", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    jobs = store_jobs(args.stores)
+    print(f"{args.stores} stores x 3 documents, {args.latency * 1000:.0f} ms per call")
+    print(f"{'stores at once':>14} {'docs/s':>8} {'calls/s':>8} {'429s':>6} {'retries':>8} "
+          f"{'seconds':>8} {'failed':>7}")
+    for concurrency in sorted({int(n) for n in args.concurrency.split(",")}):
+        # Every store is its own host on Shopify; the mock is one host for all
+        connections = args.connections or concurrency * 2
+        summary = asyncio.run(run(jobs, concurrency, connections, latency=args.latency,
+                                  error_rate=args.error_rate))
+        documents = summary["created"] + summary["updated"] + summary["unchanged"]
+        print(f"{concurrency:>14} {documents / summary['seconds']:>8.1f} "
+              f"{summary['requests_per_second']:>8.1f} {summary['throttled']:>6} "
+              f"{summary['retries']:>8} {summary['seconds']:>8.2f} {summary['failed']:>7}")
+        if summary["mock"]["duplicate_pages"]:
+            print(f"  {summary['mock']['duplicate_pages']} duplicate pages created", file=sys.stderr)
+
+    if args.rate_limit_check:
+        jobs = jobs[:args.stores_throttled]
+        print(f"\n{len(jobs)} stores against a {args.bucket_size}-call bucket leaking "
+              f"{args.leak_rate:g}/s")
+        for rate_limit in (True, False):
+            summary = asyncio.run(run(
+                jobs, len(jobs), len(jobs), rate_limit, latency=args.latency,
+                bucket_size=args.bucket_size, leak_rate=args.leak_rate))
+            label = "client token buckets" if rate_limit else "server 429s only"
+            print(f"{label:<22} {summary['requests']:>5} calls, {summary['throttled']:>4} throttled, "
+                  f"{summary['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
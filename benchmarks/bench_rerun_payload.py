@@ -0,0 +1,62 @@
+"""Bytes of ForwardMsg deltas sent to the browser per app rerun.
+
+Drives the app headlessly with Streamlit's app-testing harness, submits the
+form with all documents selected and sums the serialized size of every
+ForwardMsg the script produced; that is what goes over the websocket.
+Files served through download buttons are fetched over plain HTTP only on
+click and are not part of the rerun payload.
+
+    python benchmarks/bench_rerun_payload.py [path/to/app.py ...]
+"""
+
+import os
+import sys
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FORM_VALUES = {
+    "Company Name": "Example Store",
+    "Website URL like example.com": "example.com",
+    "Jurisdiction (e.g., Dehradun, Uttarakhand)": "Dehradun, Uttarakhand",
+    "Company Contact Email": "support@example.com",
+    "Privacy Compliance Email": "privacy@example.com",
+}
+
+_sizes = []
+_forward_msgs = LocalScriptRunner.forward_msgs
+
+
+def _recording_forward_msgs(self):
+    msgs = _forward_msgs(self)
+    _sizes.append(sum(msg.ByteSize() for msg in msgs))
+    return msgs
+
+
+LocalScriptRunner.forward_msgs = _recording_forward_msgs
+
+
+def measure(app_path):
+    at = AppTest.from_file(os.path.abspath(app_path), default_timeout=30)
+    at.run()
+    initial = _sizes[-1]
+    for widget in at.text_input:
+        if widget.label in FORM_VALUES:
+            widget.input(FORM_VALUES[widget.label])
+    at.button[0].click()
+    at.run()
+    return initial, _sizes[-1]
+
+
+def main(paths):
+    print(f"{'app':<40} {'initial rerun':>14} {'generate rerun':>15}")
+    for path in paths:
+        initial, generate = measure(path)
+        print(f"{os.path.basename(path):<40} {initial:>12,} B {generate:>13,} B")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [os.path.join(ROOT, "streamlit_app.py")])
@@ -0,0 +1,136 @@
+"""Load generator for the HTTP rendering service.
+
+Starts a local ``python -m ecomlegalgen serve`` instance (or targets
+``--host``/``--port``), opens ``--concurrency`` keep-alive connections and
+sends ``--requests`` requests spread over the three document endpoints and
+``/bundle``. Reports requests/s and p50/p90/p99 latency.
+
+    python benchmarks/bench_server_load.py --concurrency 32 --requests 5000
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ecomlegalgen import _http  # noqa: E402
+
+STORE = {
+    "company_name": "Example Store",
+    "company_contact_email": "support@example.com",
+    "privacy_compliance_email": "privacy@example.com",
+    "website_url": "example.com",
+    "jurisdiction": "Dehradun, Uttarakhand",
+    "refund_timeframe": 10,
+    "last_updated": "January 01, 2025",
+}
+
+ENDPOINTS = {
+    "documents": ["/documents/refund_policy", "/documents/privacy_policy",
+                  "/documents/terms_conditions"],
+    "bundle": ["/bundle"],
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def connection_worker(host, port, paths, counter, total, latencies, statuses, distinct):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while next(counter) < total:
+            n = len(latencies)
+            store = dict(STORE, company_name=f"Store {n % distinct}") if distinct else STORE
+            request = _http.encode_request("POST", next(paths), f"{host}:{port}",
+                                           _http.json_body(store),
+                                           {"Content-Type": "application/json"})
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            response = await _http.read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, concurrency, total, endpoints, distinct):
+    paths = itertools.cycle([path for name in endpoints for path in ENDPOINTS[name]])
+    counter = itertools.count()
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        connection_worker(host, port, paths, counter, total, latencies, statuses, distinct)
+        for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "statuses": statuses,
+    }
+
+
+def start_local_server(max_concurrency):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "ecomlegalgen", "serve", "--port", "0",
+         "--max-concurrency", str(max_concurrency)],
+        cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    if not line.startswith("Serving on"):
+        process.kill()
+        raise RuntimeError(f"Server failed to start: {line}{process.stderr.read()}")
+    host, port = line.rsplit("/", 1)[1].strip().rsplit(":", 1)
+    return process, host, int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=None, help="target an already running server")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-c", "--concurrency", type=int, default=32, help="client connections")
+    parser.add_argument("-n", "--requests", type=int, default=5000)
+    parser.add_argument("--endpoints", default="documents",
+                        help="comma-separated mix of: documents, bundle")
+    parser.add_argument("--distinct-stores", type=int, default=0,
+                        help="vary company_name over this many stores (0: one store, all cache hits)")
+    parser.add_argument("--server-max-concurrency", type=int, default=64,
+                        help="--max-concurrency for the local server")
+    args = parser.parse_args(argv)
+
+    process = None
+    host, port = args.host, args.port
+    if host is None:
+        process, host, port = start_local_server(args.server_max_concurrency)
+    try:
+        result = asyncio.run(run_load(
+            host, port, args.concurrency, args.requests,
+            [e.strip() for e in args.endpoints.split(",")], args.distinct_stores))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"{result['requests']} requests in {result['seconds']:.2f}s "
+          f"({result['requests_per_second']:,.0f} req/s) over {args.concurrency} connections")
+    print(f"latency p50 {result['p50_ms']:.2f} ms  p90 {result['p90_ms']:.2f} ms  "
+          f"p99 {result['p99_ms']:.2f} ms")
+    print(f"statuses {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
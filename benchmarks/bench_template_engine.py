@@ -0,0 +1,44 @@
+"""Renders per second: per-call ``str.format`` vs. the precompiled templates.
+
+Run from the repository root:
+
+    python benchmarks/bench_template_engine.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecomlegalgen import documents  # noqa: E402
+
+VALUES = dict(
+    company_name="Example Store",
+    company_contact_email="support@example.com",
+    privacy_compliance_email="privacy@example.com",
+    website_url="example.com",
+    jurisdiction="Dehradun, Uttarakhand",
+    refund_timeframe=10,
+    last_updated="January 01, 2025",
+)
+
+TEMPLATES = dict(documents.DOCUMENT_TEMPLATES)
+
+
+def renders_per_second(fn, number=2000, repeat=5):
+    best = min(timeit.repeat(fn, number=number, repeat=repeat))
+    return number / best
+
+
+def main():
+    print(f"{'template':<18} {'str.format/s':>14} {'compiled/s':>14} {'speedup':>9}")
+    for name, template in TEMPLATES.items():
+        assert template.source.format(**VALUES) == template.render(**VALUES)
+        before = renders_per_second(lambda: template.source.format(**VALUES))
+        after = renders_per_second(lambda: template.render(**VALUES))
+        print(f"{name:<18} {before:>14,.0f} {after:>14,.0f} {after / before:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
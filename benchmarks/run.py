@@ -0,0 +1,220 @@
+"""Benchmark suite with machine-readable results and regression checks.
+
+Measures, separately:
+
+- ``render.<document>``: latency of each generate_* function (uncached)
+- ``encode.<document>`` / ``encode.bundle``: download preparation cost
+- ``validate.record`` / ``validate.batch``: input validation of one record,
+  and per record of a 1000-record batch
+- ``ui.rerun.*``: full ``main()`` reruns through Streamlit's app-testing
+  harness, plus the ForwardMsg bytes of the "Generate Documents" rerun
+- ``memory.document_set_peak``: peak traced memory while generating and
+  encoding one full document set
+
+Every metric is "lower is better". Results are written as JSON; passing
+``--compare`` flags metrics that regressed by more than ``--threshold``
+and exits with status 1.
+
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py -o new.json --compare results.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ecomlegalgen import bundle_bytes, check_inputs, validate_records  # noqa: E402
+from ecomlegalgen.documents import DOCUMENTS  # noqa: E402
+
+INPUTS = {
+    "company_name": "Example Store",
+    "company_contact_email": "support@example.com",
+    "privacy_compliance_email": "privacy@example.com",
+    "website_url": "example.com",
+    "jurisdiction": "Dehradun, Uttarakhand",
+    "refund_timeframe": 10,
+    "last_updated": "January 01, 2025",
+}
+
+
+def _args_for(name):
+    title, generate, args = DOCUMENTS[name]
+    return generate, {arg: INPUTS[arg] for arg in args}
+
+
+def time_call(fn, number, repeat):
+    """Per-call seconds: median and min over ``repeat`` batches of ``number`` calls."""
+    timings = [t / number for t in timeit.repeat(fn, number=number, repeat=repeat)]
+    return {"unit": "s", "value": statistics.median(timings), "min": min(timings),
+            "runs": repeat * number}
+
+
+def bench_render(number, repeat):
+    results = {}
+    for name in DOCUMENTS:
+        generate, kwargs = _args_for(name)
+        results[f"render.{name}"] = time_call(lambda: generate(**kwargs), number, repeat)
+    return results
+
+
+def bench_encode(number, repeat):
+    results = {}
+    for name in DOCUMENTS:
+        generate, kwargs = _args_for(name)
+        content = generate(**kwargs)
+        results[f"encode.{name}"] = time_call(content.encode, number, repeat)
+    results["encode.bundle"] = time_call(
+        lambda: bundle_bytes(INPUTS), max(1, number // 20), repeat)
+    return results
+
+
+def bench_validate(number, repeat):
+    record = dict(INPUTS, refund_timeframe="10", website_url="https://Example.com/")
+    batch = [record] * 1000
+    batch_timing = time_call(lambda: validate_records(batch), max(1, number // 100), repeat)
+    for key in ("value", "min"):
+        batch_timing[key] /= len(batch)
+    return {
+        "validate.record": time_call(lambda: check_inputs(record), number, repeat),
+        "validate.batch": batch_timing,
+    }
+
+
+def bench_memory():
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        documents = []
+        for name in DOCUMENTS:
+            generate, kwargs = _args_for(name)
+            content = generate(**kwargs)
+            documents.append((content, content.encode()))
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return {"memory.document_set_peak": {"unit": "B", "value": peak}}
+
+
+def bench_ui(repeat):
+    # Imported lazily: only this part of the suite needs Streamlit
+    import bench_rerun_payload
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "streamlit_app.py"), default_timeout=60)
+    started = time.perf_counter()
+    at.run()
+    initial = time.perf_counter() - started
+    for widget in at.text_input:
+        if widget.label in bench_rerun_payload.FORM_VALUES:
+            widget.input(bench_rerun_payload.FORM_VALUES[widget.label])
+
+    timings = []
+    for _ in range(repeat):
+        at.button[0].click()
+        started = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - started)
+        if at.exception:
+            raise RuntimeError(f"App raised during rerun: {at.exception[0].message}")
+    payload = bench_rerun_payload._sizes[-1]
+
+    return {
+        "ui.rerun.initial": {"unit": "s", "value": initial, "runs": 1},
+        "ui.rerun.generate": {"unit": "s", "value": statistics.median(timings),
+                              "min": min(timings), "runs": repeat},
+        "ui.rerun.generate_payload": {"unit": "B", "value": payload},
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(number=500, repeat=7, ui_repeat=5, include_ui=True):
+    benchmarks = {}
+    benchmarks.update(bench_render(number, repeat))
+    benchmarks.update(bench_encode(number, repeat))
+    benchmarks.update(bench_validate(number, repeat))
+    benchmarks.update(bench_memory())
+    if include_ui:
+        benchmarks.update(bench_ui(ui_repeat))
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "benchmarks": benchmarks,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Return ``(name, old, new, ratio)`` for every metric worse by more than threshold."""
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        old = baseline.get("benchmarks", {}).get(name)
+        if not old or not old["value"]:
+            continue
+        ratio = result["value"] / old["value"]
+        if ratio > 1 + threshold:
+            regressions.append((name, old["value"], result["value"], ratio))
+    return regressions
+
+
+def _format(result):
+    value = result["value"]
+    if result["unit"] == "s":
+        return f"{value * 1e6:,.1f} us" if value < 0.01 else f"{value * 1000:,.1f} ms"
+    return f"{value:,.0f} {result['unit']}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative slowdown before a metric is flagged (default 0.2)")
+    parser.add_argument("--number", type=int, default=500, help="calls per timing batch")
+    parser.add_argument("--repeat", type=int, default=7, help="timing batches")
+    parser.add_argument("--skip-ui", action="store_true", help="skip the Streamlit rerun benchmarks")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.number, args.repeat, include_ui=not args.skip_ui)
+    for name, result in results["benchmarks"].items():
+        print(f"{name:<32} {_format(result):>14}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new, ratio in regressions:
+            print(f"REGRESSION {name}: {old:.6g} -> {new:.6g} ({(ratio - 1) * 100:+.0f}%)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Generate ecommerce legal documents (refund, privacy and terms).
+
+The package is the Streamlit-free core of the app: importing it must stay
+cheap, so nothing here may import Streamlit.
+"""
+
+from ecomlegalgen.bundle import bundle_bytes, write_bundle
+from ecomlegalgen.cache import RenderCache, cached_render, document_cache
+from ecomlegalgen.documents import (
+    DOCUMENT_TEMPLATES,
+    DOCUMENTS,
+    build_document,
+    document_templates,
+    generate_privacy_policy,
+    generate_refund_policy,
+    generate_terms_conditions,
+    render_document,
+    section_ids,
+)
+from ecomlegalgen.html_output import markdown_to_html, render_html, render_html_page
+from ecomlegalgen.incremental import IncrementalRenderer, affected_documents, field_index
+from ecomlegalgen.loader import TemplateLoader, default_loader
+from ecomlegalgen.locales import Locale, UnknownLocale, available_locales, format_date, get_locale
+from ecomlegalgen.metrics import Metrics, metrics
+from ecomlegalgen.store import DocumentStore, default_store
+from ecomlegalgen.templating import (
+    CompiledTemplate,
+    Document,
+    Placeholder,
+    Section,
+    compile_template,
+    split_sections,
+)
+from ecomlegalgen.validation import FieldError, ValidationError, check_inputs, validate_inputs, validate_records
+
+__all__ = [
+    "CompiledTemplate",
+    "DOCUMENTS",
+    "DOCUMENT_TEMPLATES",
+    "Document",
+    "DocumentStore",
+    "FieldError",
+    "IncrementalRenderer",
+    "Locale",
+    "Metrics",
+    "Placeholder",
+    "RenderCache",
+    "Section",
+    "TemplateLoader",
+    "UnknownLocale",
+    "ValidationError",
+    "affected_documents",
+    "available_locales",
+    "build_document",
+    "bundle_bytes",
+    "cached_render",
+    "check_inputs",
+    "compile_template",
+    "default_loader",
+    "default_store",
+    "document_cache",
+    "document_templates",
+    "field_index",
+    "format_date",
+    "generate_privacy_policy",
+    "generate_refund_policy",
+    "generate_terms_conditions",
+    "get_locale",
+    "markdown_to_html",
+    "metrics",
+    "render_document",
+    "render_html",
+    "render_html_page",
+    "section_ids",
+    "split_sections",
+    "validate_inputs",
+    "validate_records",
+    "write_bundle",
+]
@@ -0,0 +1,37 @@
+import argparse
+import sys
+
+from ecomlegalgen import bulk, diff, export, fleet, server, shopify
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="ecomlegalgen", description="Generate ecommerce legal documents without the Streamlit UI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bulk.add_arguments(commands.add_parser(
+        "bulk", help="render documents for many stores from a CSV or JSONL file"))
+
+    server.add_arguments(commands.add_parser(
+        "serve", help="run the HTTP rendering service"))
+
+    diff.add_arguments(commands.add_parser(
+        "diff", help="section-level changes between two versions of documents"))
+
+    fleet.add_arguments(commands.add_parser(
+        "regenerate", help="re-render only the stores' documents whose template or inputs changed"))
+
+    export.add_arguments(commands.add_parser(
+        "export", help="static site of the stores' documents as HTML and Markdown, precompressed"))
+
+    shopify.add_arguments(commands.add_parser(
+        "publish", help="upsert the stores' documents as pages of their Shopify stores"))
+
+    args = parser.parse_args(argv)
+    return {"bulk": bulk.main, "serve": server.main, "diff": diff.main,
+            "regenerate": fleet.main, "publish": shopify.main,
+            "export": export.main}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Minimal HTTP/1.1 message handling over asyncio streams.
+
+Only what the document service and its clients need: Content-Length
+request bodies, keep-alive and a bounded header size. Responses may also
+be chunked or delimited by the end of the connection, as upstream APIs
+such as Shopify's send them.
+"""
+
+import asyncio
+import json
+from collections import namedtuple
+from http import HTTPStatus
+
+Request = namedtuple("Request", "method path version headers body")
+Response = namedtuple("Response", "status headers body")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None, details=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+        self.message = message or HTTPStatus(status).phrase
+        # Extra fields for the JSON error body
+        self.details = details or {}
+
+
+async def _read_head(reader):
+    """Read the start line and headers; returns None on a clean EOF."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise HTTPError(400, "Truncated message head")
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431)
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise HTTPError(400, "Malformed header line")
+        headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+async def _read_body(reader, headers, max_body):
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(411, "Chunked bodies are not supported; send Content-Length")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length")
+    if max_body is not None and length > max_body:
+        raise HTTPError(413)
+    return await reader.readexactly(length) if length else b""
+
+
+async def read_request(reader, max_body=None):
+    head = await _read_head(reader)
+    if head is None:
+        return None
+    start_line, headers = head
+    parts = start_line.split(" ")
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise HTTPError(400, "Malformed request line")
+    method, path, version = parts
+    body = await _read_body(reader, headers, max_body)
+    return Request(method, path, version, headers, body)
+
+
+async def _read_line(reader):
+    try:
+        return await reader.readuntil(b"\r\n")
+    except asyncio.LimitOverrunError:
+        raise HTTPError(502, "Chunk line too long")
+
+
+async def _read_chunked(reader):
+    chunks = []
+    while True:
+        size_line = await _read_line(reader)
+        try:
+            size = int(size_line.split(b";", 1)[0], 16)
+        except ValueError:
+            raise HTTPError(502, "Malformed chunk size")
+        if not size:
+            # Skip any trailers up to the final empty line
+            while await _read_line(reader) != b"\r\n":
+                pass
+            return b"".join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+async def read_response(reader, method="GET"):
+    head = await _read_head(reader)
+    if head is None:
+        raise ConnectionError("Connection closed before a response was received")
+    status_line, headers = head
+    try:
+        status = int(status_line.split(" ", 2)[1])
+    except (IndexError, ValueError):
+        raise HTTPError(502, "Malformed status line")
+    if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+        body = b""
+    elif "chunked" in headers.get("transfer-encoding", "").lower():
+        body = await _read_chunked(reader)
+    elif "content-length" not in headers:
+        # Delimited by the server closing the connection
+        headers["connection"] = "close"
+        body = await reader.read()
+    else:
+        body = await _read_body(reader, headers, None)
+    return Response(status, headers, body)
+
+
+def keep_alive(request):
+    connection = request.headers.get("connection", "").lower()
+    if request.version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+def encode_response(status, body=b"", content_type="text/plain; charset=utf-8",
+                    headers=None, keep_alive=True):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def encode_request(method, path, host, body=b"", headers=None):
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}"]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def json_body(data):
+    return json.dumps(data).encode()
@@ -0,0 +1,269 @@
+"""Headless bulk generation of store documents from CSV or JSONL records.
+
+    python -m ecomlegalgen bulk stores.csv -o out/ --workers 8
+
+Each record is rendered into ``<output>/<store_id>/<document>.md``. Records
+are dispatched to a process (or thread) pool in chunks and validated one
+chunk at a time; a failing record is reported in ``<output>/failures.jsonl``
+(invalid fields under ``fields``) without aborting the batch. A
+record's optional ``locale`` field picks the language of its documents
+(default ``--locale``).
+"""
+
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date
+
+from ecomlegalgen.documents import DOCUMENTS, document_templates, render_document
+from ecomlegalgen.locales import format_date, get_locale
+from ecomlegalgen.store import default_store
+from ecomlegalgen.validation import ValidationError, normalize_domain, validate_records
+
+
+class RecordError(ValueError):
+    pass
+
+
+def read_records(path, fmt=None):
+    """Yield ``(line_number, record_or_exception)`` pairs from a CSV or JSONL file."""
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for index, row in enumerate(csv.DictReader(f), start=2):
+                yield index, row
+        elif fmt == "jsonl":
+            for index, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        raise RecordError("expected a JSON object")
+                    yield index, record
+                except ValueError as e:
+                    yield index, RecordError(f"invalid JSON: {e}")
+        else:
+            raise ValueError(f"Unknown input format: {fmt}")
+
+
+def store_id_for(record, seen):
+    website = record.get("website_url")
+    website = normalize_domain(website) if isinstance(website, str) else website
+    base = str(record.get("store_id") or website or record.get("company_name") or "store")
+    base = re.sub(r"[^a-z0-9]+", "-", base.strip().lower()).strip("-") or "store"
+    store_id, n = base, 1
+    while store_id in seen:
+        n += 1
+        store_id = f"{base}-{n}"
+    seen.add(store_id)
+    return store_id
+
+
+def check_documents(documents):
+    """``documents`` as a tuple; raises ValueError naming any unknown ones."""
+    unknown = set(documents) - set(DOCUMENTS)
+    if unknown:
+        raise ValueError(f"Unknown documents: {', '.join(sorted(unknown))}")
+    return tuple(documents)
+
+
+def document_list(value):
+    """The document names of a comma-separated ``--documents`` value."""
+    return [d.strip() for d in value.split(",") if d.strip()]
+
+
+def make_pool(executor="process", workers=None):
+    """A process pool of ``workers`` (default: one per CPU), or a thread pool."""
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    return pool_class(max_workers=workers)
+
+
+def load_stores(path, fmt=None, last_updated=None, locale=None, log=sys.stderr):
+    """Read and validate the stores of a CSV/JSONL file, as one batch.
+
+    Returns ``(stores, failed)``: one ``(line, store_id, record, inputs,
+    locale_code)`` per valid record, with ``inputs`` normalized (and dated
+    ``last_updated`` when the record has no date of its own). Unreadable and
+    invalid records are reported on ``log`` and counted in ``failed``.
+    """
+    records, failed, seen = [], 0, set()
+    for line, record in read_records(path, fmt):
+        if isinstance(record, Exception):
+            failed += 1
+            print(f"line {line}: {record}", file=log)
+            continue
+        records.append((line, record))
+    stores = []
+    checked = validate_records([record for _, record in records], last_updated)
+    for (line, record), (inputs, errors) in zip(records, checked):
+        try:
+            if errors:
+                raise ValidationError(errors)
+            store_locale = get_locale(record.get("locale") or locale).code
+        except (ValidationError, LookupError) as e:
+            failed += 1
+            print(f"line {line}: {e}", file=log)
+            continue
+        stores.append((line, store_id_for(record, seen), record, inputs, store_locale))
+    return stores, failed
+
+
+def render_chunk(chunk, documents, output_dir, last_updated, locale=None):
+    """Render and write every document of each ``(line, store_id, record)`` in chunk.
+
+    Documents are streamed straight into their files, so a worker never holds
+    a whole rendered document in memory. Runs inside pool workers; returns
+    one result dict per record. With ``ECOMLEGALGEN_STORE_DIR`` set, documents
+    go through the on-disk store instead so repeated runs skip rendering.
+    ``last_updated`` is either a string or a date formatted per record locale.
+    The whole chunk is validated in one batch before anything is rendered.
+    """
+    store = default_store()
+    results = []
+    checked = validate_records([record for _, _, record in chunk])
+    for (line, store_id, record), (inputs, errors) in zip(chunk, checked):
+        result = {"line": line, "store_id": store_id, "documents": 0, "bytes": 0}
+        try:
+            if errors:
+                raise ValidationError(errors)
+            record_locale = record.get("locale") or locale
+            templates = document_templates(record_locale)
+            if "last_updated" not in inputs:
+                stamp = last_updated
+                if isinstance(stamp, date):
+                    stamp = format_date(stamp, record_locale)
+                inputs["last_updated"] = stamp
+            store_dir = os.path.join(output_dir, store_id)
+            os.makedirs(store_dir, exist_ok=True)
+            for name in documents:
+                with open(os.path.join(store_dir, f"{name}.md"), "wb") as f:
+                    if store is not None:
+                        # Reuse documents already rendered into the shared store
+                        data = render_document(name, inputs, locale=record_locale).encode()
+                        f.write(data)
+                        result["bytes"] += len(data)
+                    else:
+                        result["bytes"] += templates[name].write_to(f, **inputs)
+                result["documents"] += 1
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            if isinstance(e, ValidationError):
+                result["fields"] = e.fields()
+        results.append(result)
+    return results
+
+
+def run_bulk(input_path, output_dir, documents=tuple(DOCUMENTS), workers=None,
+             executor="process", chunksize=64, input_format=None, last_updated=None,
+             locale=None, log=sys.stderr):
+    """Render all records of ``input_path`` and return a summary dict."""
+    documents = check_documents(documents)
+    # Fail fast on a bad default locale rather than once per record
+    get_locale(locale)
+    last_updated = last_updated or date.today()
+    os.makedirs(output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    failures = []
+    chunks, chunk, seen = [], [], set()
+    for line, record in read_records(input_path, input_format):
+        if isinstance(record, Exception):
+            failures.append({"line": line, "store_id": None, "error": str(record)})
+            continue
+        chunk.append((line, store_id_for(record, seen), record))
+        if len(chunk) >= chunksize:
+            chunks.append(chunk)
+            chunk = []
+    if chunk:
+        chunks.append(chunk)
+
+    succeeded = documents_written = bytes_written = 0
+    with make_pool(executor, workers) as pool:
+        futures = [pool.submit(render_chunk, c, documents, output_dir, last_updated, locale)
+                   for c in chunks]
+        for future in as_completed(futures):
+            for result in future.result():
+                documents_written += result["documents"]
+                bytes_written += result["bytes"]
+                if "error" in result:
+                    failures.append(result)
+                else:
+                    succeeded += 1
+
+    elapsed = time.perf_counter() - started
+    failures.sort(key=lambda r: r["line"])
+    failures_path = os.path.join(output_dir, "failures.jsonl")
+    if failures:
+        with open(failures_path, "w", encoding="utf-8") as f:
+            for failure in failures:
+                f.write(json.dumps(failure) + "\n")
+    elif os.path.exists(failures_path):
+        os.remove(failures_path)
+
+    summary = {
+        "records": succeeded + len(failures),
+        "succeeded": succeeded,
+        "failed": len(failures),
+        "documents": documents_written,
+        "bytes": bytes_written,
+        "seconds": round(elapsed, 3),
+        "records_per_second": round((succeeded + len(failures)) / elapsed, 1) if elapsed else None,
+        "documents_per_second": round(documents_written / elapsed, 1) if elapsed else None,
+    }
+    if log:
+        for failure in failures:
+            print(f"line {failure['line']}: {failure['error']}", file=log)
+        print(f"{summary['succeeded']}/{summary['records']} records, {documents_written} documents "
+              f"in {elapsed:.2f}s ({summary['records_per_second']} records/s, "
+              f"{summary['documents_per_second']} documents/s)", file=log)
+    return summary
+
+
+def add_record_arguments(parser, verb, records="records", last_updated=True, kept=None):
+    """``--documents`` and the options for reading store records.
+
+    ``kept`` names what keeps its date when only the default date changed
+    (``"files"``, ``"pages"``); ``last_updated=False`` leaves the option out.
+    """
+    parser.add_argument("-d", "--documents", default=",".join(DOCUMENTS),
+                        help=f"comma-separated documents to {verb} (default: all)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default=None,
+                        help="input format (default: from file extension)")
+    if last_updated:
+        default = f"today, kept on {kept} whose content is otherwise unchanged" if kept else "today"
+        parser.add_argument("--last-updated", default=None,
+                            help=f'"Last Updated" date for records without one (default: {default})')
+    parser.add_argument("--locale", default=None,
+                        help=f"language of {records} without a locale field (default: en)")
+
+
+def add_pool_arguments(parser, chunk=None, chunksize=64):
+    """``--workers`` and ``--executor``, plus ``--chunksize`` if ``chunk`` names its items."""
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="pool size (default: number of CPUs)")
+    parser.add_argument("--executor", choices=("process", "thread"), default="process")
+    if chunk:
+        parser.add_argument("--chunksize", type=int, default=chunksize,
+                            help=f"{chunk} per dispatched task")
+
+
+def add_arguments(parser):
+    parser.add_argument("input", help="CSV or JSONL file with one store per row/line")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    add_record_arguments(parser, "render")
+    add_pool_arguments(parser, "records")
+
+
+def main(args):
+    summary = run_bulk(
+        args.input, args.output,
+        documents=document_list(args.documents),
+        workers=args.workers, executor=args.executor, chunksize=args.chunksize,
+        input_format=args.format, last_updated=args.last_updated, locale=args.locale,
+    )
+    return 1 if summary["failed"] else 0
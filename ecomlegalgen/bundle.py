@@ -0,0 +1,46 @@
+"""Single-pass ZIP bundle of a store's documents.
+
+Every document is streamed from its compiled template straight into its
+zip entry, so at most one document's chunks are in flight at a time. Entry
+timestamps, permissions and the compression level are fixed, which makes
+the archive for identical inputs byte-for-byte identical.
+"""
+
+import io
+import zipfile
+
+from ecomlegalgen.documents import document_templates
+
+COMPRESSION = zipfile.ZIP_DEFLATED
+COMPRESSLEVEL = 6
+# Earliest timestamp the zip format can store; used for every entry.
+ENTRY_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def write_bundle(stream, inputs, documents=None, templates=None, sections=None, locale=None):
+    """Write a ZIP of ``documents`` rendered with ``inputs`` into ``stream``.
+
+    ``stream`` needs ``write`` and ``flush`` methods (``ZipFile.close()`` flushes);
+    non-seekable streams (sockets, HTTP responses) are supported. ``sections``
+    optionally maps a document to the section ids to include. Templates are
+    those of ``locale`` unless ``templates`` is given. Returns the uncompressed
+    size written.
+    """
+    sections = sections or {}
+    templates = document_templates(locale) if templates is None else templates
+    documents = tuple(templates) if documents is None else tuple(documents)
+    written = 0
+    with zipfile.ZipFile(stream, "w", compression=COMPRESSION, compresslevel=COMPRESSLEVEL) as archive:
+        for name in documents:
+            info = zipfile.ZipInfo(f"{name}.md", date_time=ENTRY_DATE_TIME)
+            info.compress_type = COMPRESSION
+            info.external_attr = 0o644 << 16
+            with archive.open(info, "w") as entry:
+                written += templates[name].write_to(entry, sections=sections.get(name), **inputs)
+    return written
+
+
+def bundle_bytes(inputs, documents=None, templates=None, sections=None, locale=None):
+    buffer = io.BytesIO()
+    write_bundle(buffer, inputs, documents, templates, sections, locale)
+    return buffer.getvalue()
@@ -0,0 +1,105 @@
+"""Process-wide bounded LRU cache for rendered documents.
+
+Streamlit re-executes ``streamlit_app.py`` on every rerun, so the shared
+cache lives in this (imported, hence persistent) module rather than in the
+app script. Size and TTL default to the ``ECOMLEGALGEN_CACHE_SIZE`` and
+``ECOMLEGALGEN_CACHE_TTL`` environment variables.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 256
+DEFAULT_TTL = 3600.0
+
+
+class RenderCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, timer=time.monotonic):
+        if maxsize < 0:
+            raise ValueError("maxsize must be >= 0")
+        self.maxsize = maxsize
+        # A ttl of None (or <= 0) keeps entries until they are evicted by size.
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._timer = timer
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > self._timer():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        expires_at = self._timer() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_render(self, key, render):
+        # Rendering happens outside the lock; two threads missing on the same
+        # key at once simply both render it, which is cheaper than serializing.
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = render()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_MISSING = object()
+
+
+def make_key(template, inputs):
+    # Only the fields a template actually uses take part in its key, so e.g.
+    # a jurisdiction change does not invalidate the cached refund policy.
+    return (template.version,) + tuple(
+        (name, inputs[name]) for name in sorted(template.fields))
+
+
+def cached_render(template, generate, cache=None, **inputs):
+    cache = document_cache if cache is None else cache
+    return cache.get_or_render(make_key(template, inputs), lambda: generate(**inputs))
+
+
+document_cache = RenderCache(
+    maxsize=int(os.environ.get("ECOMLEGALGEN_CACHE_SIZE", DEFAULT_MAXSIZE)),
+    ttl=float(os.environ.get("ECOMLEGALGEN_CACHE_TTL", DEFAULT_TTL)),
+)
@@ -0,0 +1,266 @@
+"""Section-level diff between two versions of a rendered document.
+
+Privacy Policy Section 9 and Terms Section 19 promise users a notice of
+material changes; this works out what such a notice has to say.
+
+    python -m ecomlegalgen diff old/ new/ -o changes.jsonl
+
+Byte-identical files are skipped without being parsed. Otherwise both
+versions are split at their heading lines (the same anchors the templates
+use for sections), sections are matched by id, identical ones are skipped,
+and only the sections that really differ are compared line by line.
+A section whose heading changed but whose body did not (e.g. renumbered
+"SECTION 7" -> "SECTION 8") is reported as renamed rather than as one
+removal plus one addition.
+
+``fingerprint`` reduces a document to its section hashes, so the old side
+of a diff can be a stored fingerprint instead of the full old text; the
+changed sections are still found, only the line counts are unknown.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+from ecomlegalgen.bulk import add_pool_arguments, make_pool
+from ecomlegalgen.templating import split_sections
+
+SectionHash = namedtuple("SectionHash", "id title digest body_digest")
+
+# kind is "added", "removed", "modified" or "renamed"; added/removed count
+# lines and are None when the old side was only a fingerprint
+SectionChange = namedtuple("SectionChange", "kind id title old_title added removed")
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def _body(text):
+    # Everything after the heading line
+    return text.partition("\n")[2]
+
+
+def fingerprint(text):
+    """Section hashes of a rendered document, in document order."""
+    return tuple(SectionHash(section_id, title, _digest(section), _digest(_body(section)))
+                 for section_id, title, section in split_sections(text))
+
+
+class DocumentDiff:
+    """Section changes between two versions of a document."""
+
+    __slots__ = ("changes", "unchanged")
+
+    def __init__(self, changes=(), unchanged=0):
+        self.changes = tuple(changes)
+        self.unchanged = unchanged
+
+    @property
+    def changed(self):
+        return bool(self.changes)
+
+    def counts(self):
+        counts = {"added": 0, "removed": 0, "modified": 0, "renamed": 0}
+        for change in self.changes:
+            counts[change.kind] += 1
+        counts["unchanged"] = self.unchanged
+        return counts
+
+    def summary(self):
+        """Compact, human-readable change notice; empty if nothing changed."""
+        lines = []
+        for change in self.changes:
+            if change.kind == "added":
+                lines.append(f"+ {change.title}")
+            elif change.kind == "removed":
+                lines.append(f"- {change.title}")
+            elif change.kind == "renamed":
+                lines.append(f"~ {change.old_title} -> {change.title}")
+            elif change.added is None:
+                lines.append(f"~ {change.title}")
+            else:
+                lines.append(f"~ {change.title} (+{change.added} -{change.removed} lines)")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {"counts": self.counts(), "changes": [change._asdict() for change in self.changes]}
+
+    def __repr__(self):
+        counts = ", ".join(f"{n} {kind}" for kind, n in self.counts().items() if n)
+        return f"<DocumentDiff {counts or 'empty'}>"
+
+
+def _line_counts(old_text, new_text):
+    added = removed = 0
+    matcher = difflib.SequenceMatcher(None, old_text.splitlines(), new_text.splitlines(),
+                                      autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            removed += i2 - i1
+            added += j2 - j1
+    return added, removed
+
+
+def diff_documents(old, new):
+    """Diff two versions of a rendered document.
+
+    ``old`` is the previous text or its ``fingerprint``; ``new`` is the new
+    text. Changes are listed in new-document order, followed by removals.
+    """
+    if isinstance(old, str) and old == new:
+        return DocumentDiff(unchanged=len(split_sections(new)))
+
+    texts = isinstance(old, str)
+    if texts:
+        # With both texts at hand, comparing strings is cheaper than hashing them
+        old_sections = {section_id: (title, text) for section_id, title, text in split_sections(old)}
+    else:
+        old_sections = {section.id: (section.title, section) for section in old}
+
+    changes, added, unchanged = [], [], 0
+    for section_id, title, text in split_sections(new):
+        previous = old_sections.pop(section_id, None)
+        if previous is None:
+            added.append((section_id, title, text))
+            continue
+        old_title, before = previous
+        if (before == text) if texts else (before.digest == _digest(text)):
+            unchanged += 1
+            continue
+        counts = _line_counts(before, text) if texts else (None, None)
+        changes.append(SectionChange("modified", section_id, title, old_title, *counts))
+
+    # A heading that changed over an identical body is a rename
+    removed_by_body = {}
+    for section_id, (old_title, before) in old_sections.items():
+        body_digest = _digest(_body(before)) if texts else before.body_digest
+        removed_by_body.setdefault(body_digest, []).append(section_id)
+    for section_id, title, text in added:
+        candidates = removed_by_body.get(_digest(_body(text))) if removed_by_body else None
+        if candidates:
+            old_title, _ = old_sections.pop(candidates.pop(0))
+            counts = (1, 1) if texts else (None, None)
+            changes.append(SectionChange("renamed", section_id, title, old_title, *counts))
+        else:
+            changes.append(SectionChange("added", section_id, title, None, len(text.splitlines()), 0))
+
+    for section_id, (old_title, before) in old_sections.items():
+        lines = len(before.splitlines()) if texts else None
+        changes.append(SectionChange("removed", section_id, old_title, old_title, 0, lines))
+    return DocumentDiff(changes, unchanged)
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def diff_files(old_path, new_path):
+    """Diff two document files; a missing side counts as an empty document.
+
+    Byte-identical files are not parsed, so their diff has ``unchanged == 0``.
+    """
+    old, new = _read(old_path), _read(new_path)
+    if old == new:
+        # Byte-identical documents (most stores, for most edits) need no parsing
+        return DocumentDiff()
+    return diff_documents((old or b"").decode("utf-8"), (new or b"").decode("utf-8"))
+
+
+def diff_chunk(pairs):
+    """Diff ``(store_id, document, old_path, new_path)`` pairs; runs in pool workers."""
+    results = []
+    for store_id, document, old_path, new_path in pairs:
+        result = {"store_id": store_id, "document": document}
+        try:
+            diff = diff_files(old_path, new_path)
+            if diff.changed:
+                result.update(diff.to_dict(), summary=diff.summary())
+            else:
+                result["unchanged"] = True
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        results.append(result)
+    return results
+
+
+def _document_pairs(old_dir, new_dir):
+    # <dir>/<store_id>/<document>.md, as written by ``bulk``
+    pairs = set()
+    for root in (old_dir, new_dir):
+        for store_id in os.listdir(root):
+            store_dir = os.path.join(root, store_id)
+            if not os.path.isdir(store_dir):
+                continue
+            for file_name in os.listdir(store_dir):
+                if file_name.endswith(".md"):
+                    pairs.add((store_id, file_name[:-3]))
+    return [(store_id, document,
+             os.path.join(old_dir, store_id, f"{document}.md"),
+             os.path.join(new_dir, store_id, f"{document}.md"))
+            for store_id, document in sorted(pairs)]
+
+
+def diff_trees(old_dir, new_dir, workers=None, executor="process", chunksize=256):
+    """Diff every document of two ``bulk`` output directories.
+
+    Yields one result dict per document, in store order: unchanged ones
+    only carry ``"unchanged": True``.
+    """
+    pairs = _document_pairs(old_dir, new_dir)
+    chunks = [pairs[i:i + chunksize] for i in range(0, len(pairs), chunksize)]
+    with make_pool(executor, workers) as pool:
+        for results in pool.map(diff_chunk, chunks):
+            yield from results
+
+
+def add_arguments(parser):
+    parser.add_argument("old", help="previous document, or previous bulk output directory")
+    parser.add_argument("new", help="new document, or new bulk output directory")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write one JSON line per changed document here (directories only)")
+    add_pool_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a summary")
+
+
+def main(args):
+    if not os.path.isdir(args.old) and not os.path.isdir(args.new):
+        diff = diff_files(args.old, args.new)
+        print(json.dumps(diff.to_dict(), ensure_ascii=False) if args.json else diff.summary())
+        return 1 if diff.changed else 0
+
+    started = time.perf_counter()
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    compared = changed = failed = 0
+    try:
+        for result in diff_trees(args.old, args.new, args.workers, args.executor):
+            compared += 1
+            if result.get("unchanged"):
+                continue
+            if "error" in result:
+                failed += 1
+                print(f"{result['store_id']}/{result['document']}: {result['error']}", file=sys.stderr)
+                continue
+            changed += 1
+            if output:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            elif args.json:
+                print(json.dumps(result, ensure_ascii=False))
+            else:
+                print(f"{result['store_id']}/{result['document']}")
+                print("  " + result["summary"].replace("\n", "\n  "))
+    finally:
+        if output:
+            output.close()
+    elapsed = time.perf_counter() - started
+    print(f"{compared} documents compared, {changed} changed, {failed} failed in {elapsed:.2f}s",
+          file=sys.stderr)
+    return 1 if changed or failed else 0
@@ -0,0 +1,120 @@
+"""Streamlit-free core: the documents and their generate_* functions.
+
+The template text lives in ``templates/<document>.md`` and is loaded,
+compiled and hot-reloaded by ``ecomlegalgen.loader``. Translations live in
+locale packs (``ecomlegalgen.locales``); every function here takes an
+optional ``locale`` and defaults to English.
+
+This module (and the ``ecomlegalgen`` package) must not import Streamlit,
+so scripts, workers and services can render documents without paying its
+import cost. ``benchmarks/bench_import_time.py`` guards this.
+"""
+
+from functools import partial
+
+from ecomlegalgen.cache import cached_render, make_key
+from ecomlegalgen.loader import TemplateMapping, default_loader
+from ecomlegalgen.locales import DEFAULT_LOCALE, get_locale, normalize_locale
+from ecomlegalgen.metrics import metrics
+from ecomlegalgen.store import default_store
+
+
+def generate_refund_policy(company_name, company_contact_email, refund_timeframe, last_updated,
+                           locale=None):
+    return document_templates(locale)["refund_policy"].render(
+        company_contact_email=company_contact_email,
+        refund_timeframe=refund_timeframe,
+        last_updated=last_updated
+    )
+
+
+def generate_privacy_policy(company_name, company_contact_email, last_updated, website_url, privacy_compliance_email,
+                            locale=None):
+    return document_templates(locale)["privacy_policy"].render(
+        company_name=company_name,
+        company_contact_email=company_contact_email,
+        last_updated=last_updated,
+        website_url=website_url,
+        privacy_compliance_email=privacy_compliance_email,
+    )
+
+
+def generate_terms_conditions(company_name, company_contact_email, last_updated, website_url, jurisdiction,
+                              locale=None):
+    return document_templates(locale)["terms_conditions"].render(
+        company_name=company_name,
+        company_contact_email=company_contact_email,
+        last_updated=last_updated,
+        website_url=website_url,
+        jurisdiction=jurisdiction
+    )
+
+
+# Compiled template behind each generate_* function, for streaming renders;
+# each one is loaded from templates/<name>.md on first use
+DOCUMENT_TEMPLATES = TemplateMapping(default_loader, ("refund_policy", "privacy_policy", "terms_conditions"))
+
+# Document name -> (title, generate_* function, its arguments)
+DOCUMENTS = {
+    "refund_policy": ("Shipping and Return Policy", generate_refund_policy,
+                      ("company_name", "company_contact_email", "refund_timeframe", "last_updated")),
+    "privacy_policy": ("Privacy Policy", generate_privacy_policy,
+                       ("company_name", "company_contact_email", "last_updated", "website_url",
+                        "privacy_compliance_email")),
+    "terms_conditions": ("Terms and Conditions", generate_terms_conditions,
+                         ("company_name", "company_contact_email", "last_updated", "website_url",
+                          "jurisdiction")),
+}
+
+
+def document_templates(locale=None):
+    """Document name -> compiled template in ``locale``; English by default."""
+    if locale is None or normalize_locale(locale) == DEFAULT_LOCALE:
+        return DOCUMENT_TEMPLATES
+    return TemplateMapping(get_locale(locale), DOCUMENT_TEMPLATES)
+
+
+def section_ids(name, locale=None):
+    """Ids of the sections of document ``name``, in document order."""
+    return [section.id for section in document_templates(locale)[name].sections]
+
+
+def render_document(name, inputs, sections=None, locale=None):
+    """Render document ``name``; ``sections`` optionally selects which sections to include."""
+    # Reuses cached renders of identical submissions from any session; every
+    # locale has a cache of its own
+    _, generate, args = DOCUMENTS[name]
+    locale = get_locale(locale)
+    template = locale.get(name)
+    if locale.code != DEFAULT_LOCALE:
+        generate = partial(generate, locale=locale.code)
+    kwargs = {arg: inputs[arg] for arg in args}
+    if sections is not None:
+        sections = tuple(sorted(set(sections)))
+        if len(sections) == len(template.sections):
+            sections = None
+
+    with metrics.timer("render", name):
+        if sections is not None:
+            # Only the selected sections' segments are joined
+            key = make_key(template, kwargs) + (("sections", sections),)
+            content = locale.cache.get_or_render(
+                key, lambda: template.render_sections(sections, **kwargs))
+        else:
+            store = default_store()
+            if store is not None:
+                # Memory cache first, then the on-disk store, then a real render
+                generate = partial(store.get_or_render, name, template, generate)
+            content = cached_render(template, generate, cache=locale.cache, **kwargs)
+    metrics.inc("documents_generated_total", document=name)
+    return content
+
+
+def build_document(name, inputs, sections=None, locale=None):
+    """Document ``name`` as a compact Document that renders only when materialized.
+
+    Meant for holding many stores' documents at once: each one keeps just
+    its values and shares the template's text with all the others.
+    """
+    *_, args = DOCUMENTS[name]
+    return get_locale(locale).get(name).document(sections, **{arg: inputs[arg] for arg in args})
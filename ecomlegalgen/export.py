@@ -0,0 +1,237 @@
+"""Static site export of store documents, precompressed, with an ETag manifest.
+
+    python -m ecomlegalgen export stores.csv -o site/ --workers 8
+
+Every store (records as for ``bulk``) gets ``<output>/<store_id>/<document>.html``
+(a standalone page) and ``.md``, each with ``.gz`` and ``.br`` variants next
+to it, so a plain web server (``gzip_static``/``brotli_static``) or a CDN
+can serve them without rendering or compressing anything. Brotli variants
+need the optional ``brotli`` package and are skipped without it.
+
+``<output>/manifest.json`` maps every file's path to its strong ETag (from
+the SHA-256 of its bytes; variants append ``-gzip``/``-br``), size, content
+type and variants. It also keeps a digest of each file's source content,
+rendered without a default "Last Updated" date: a re-export renders that
+again and leaves files whose source is unchanged alone, so an incremental
+run over a large fleet only writes, compresses and re-dates what really
+changed. Files are replaced atomically, and exports of a subset of the
+stores keep the other stores' manifest entries.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import as_completed
+
+from ecomlegalgen.bulk import (
+    add_pool_arguments, add_record_arguments, check_documents, document_list, load_stores, make_pool)
+from ecomlegalgen.documents import DOCUMENTS
+from ecomlegalgen.html_output import render_html_page
+from ecomlegalgen.locales import format_date, get_locale
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST = "manifest.json"
+MANIFEST_FORMAT = 1
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+ENCODINGS = ("gzip", "br")
+SUFFIXES = {"gzip": ".gz", "br": ".br"}
+CONTENT_TYPES = {"html": "text/html; charset=utf-8", "md": "text/markdown; charset=utf-8"}
+
+
+def _compress(encoding, data, brotli_quality=BROTLI_QUALITY):
+    if encoding == "gzip":
+        # mtime=0 keeps the output, and so its ETag, identical for identical input
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return brotli.compress(data, quality=brotli_quality)
+
+
+def available_encodings(encodings=ENCODINGS):
+    return tuple(encoding for encoding in encodings if encoding != "br" or brotli is not None)
+
+
+def _render(kind, name, inputs, locale):
+    if kind == "html":
+        return render_html_page(name, inputs, locale=locale)
+    return get_locale(locale).get(name).render(**inputs)
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _write_atomic(path, data):
+    temporary = f"{path}.tmp{os.getpid()}"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def _current(output_dir, path, entry, source, encodings):
+    # Unchanged source, and every file of the entry still in place
+    if entry is None or entry.get("source") != source:
+        return False
+    if not set(encodings) <= set(entry.get("variants", ())):
+        return False
+    paths = [path] + [variant["path"] for variant in entry.get("variants", {}).values()]
+    return all(os.path.exists(os.path.join(output_dir, p)) for p in paths)
+
+
+def export_chunk(chunk, output_dir, documents, encodings, previous,
+                 brotli_quality=BROTLI_QUALITY):
+    """Export every ``(store_id, inputs, locale, dated)`` of ``chunk``.
+
+    ``dated`` is False when ``inputs["last_updated"]`` is just today's date,
+    which then stays out of the source digest. ``previous`` maps the chunk's
+    paths to their old manifest entries. Runs inside pool workers; returns
+    one result dict per store.
+    """
+    results = []
+    for store_id, inputs, locale, dated in chunk:
+        result = {"store_id": store_id, "entries": {}, "written": 0, "unchanged": 0, "bytes": 0}
+        try:
+            undated = inputs if dated else dict(inputs, last_updated="")
+            store_dir = os.path.join(output_dir, store_id)
+            for name in documents:
+                for kind in ("html", "md"):
+                    path = f"{store_id}/{name}.{kind}"
+                    content = _render(kind, name, undated, locale).encode()
+                    source = _digest(content)
+                    entry = previous.get(path)
+                    if _current(output_dir, path, entry, source, encodings):
+                        result["entries"][path] = entry
+                        result["unchanged"] += 1
+                        continue
+                    data = content if dated else _render(kind, name, inputs, locale).encode()
+                    etag = _digest(data)
+                    entry = {"etag": f'"{etag}"', "bytes": len(data),
+                             "content_type": CONTENT_TYPES[kind], "source": source, "variants": {}}
+                    os.makedirs(store_dir, exist_ok=True)
+                    target = os.path.join(output_dir, path)
+                    for encoding in ENCODINGS:
+                        variant_path = path + SUFFIXES[encoding]
+                        if encoding not in encodings:
+                            # Don't leave a variant of the old content behind
+                            if os.path.exists(os.path.join(output_dir, variant_path)):
+                                os.remove(os.path.join(output_dir, variant_path))
+                            continue
+                        compressed = _compress(encoding, data, brotli_quality)
+                        _write_atomic(target + SUFFIXES[encoding], compressed)
+                        entry["variants"][encoding] = {
+                            "path": variant_path, "etag": f'"{etag}-{encoding}"',
+                            "bytes": len(compressed)}
+                        result["bytes"] += len(compressed)
+                    # The plain file last, so its presence means the variants are current
+                    _write_atomic(target, data)
+                    result["bytes"] += len(data)
+                    result["entries"][path] = entry
+                    result["written"] += 1
+        except Exception as e:
+            result = {"store_id": store_id, "error": f"{type(e).__name__}: {e}"}
+        results.append(result)
+    return results
+
+
+def load_manifest(output_dir):
+    """The ``files`` of ``<output_dir>/manifest.json``; empty if missing or unreadable."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+        return {}
+    return manifest.get("files", {})
+
+
+def write_manifest(output_dir, files):
+    data = json.dumps({"format": MANIFEST_FORMAT, "files": files}, sort_keys=True,
+                      ensure_ascii=False, separators=(",", ":")).encode()
+    _write_atomic(os.path.join(output_dir, MANIFEST), data)
+
+
+def run_export(input_path, output_dir, documents=tuple(DOCUMENTS), workers=None,
+               executor="process", chunksize=64, input_format=None, last_updated=None,
+               locale=None, encodings=ENCODINGS, brotli_quality=BROTLI_QUALITY, log=sys.stderr):
+    """Export the stores of a CSV/JSONL file as a static site; returns a summary dict."""
+    documents = check_documents(documents)
+    if "br" in encodings and brotli is None:
+        print("brotli is not installed; skipping .br variants (pip install brotli)", file=log)
+    encodings = available_encodings(encodings)
+    started = time.perf_counter()
+
+    stores = []
+    records, failed = load_stores(input_path, input_format, last_updated, locale, log)
+    for _, store_id, _, inputs, store_locale in records:
+        dated = "last_updated" in inputs
+        if not dated:
+            inputs["last_updated"] = format_date(locale=store_locale)
+        stores.append((store_id, inputs, store_locale, dated))
+
+    manifest = load_manifest(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    summary = {"stores": 0, "files_written": 0, "files_unchanged": 0, "bytes_written": 0,
+               "failed": failed, "encodings": list(encodings)}
+    chunks = [stores[i:i + chunksize] for i in range(0, len(stores), chunksize)]
+    with make_pool(executor, workers) as pool:
+        futures = []
+        for chunk in chunks:
+            # Only the entries this chunk can reuse travel to the worker
+            previous = {}
+            for store_id, _, _, _ in chunk:
+                for name in documents:
+                    for kind in ("html", "md"):
+                        path = f"{store_id}/{name}.{kind}"
+                        if path in manifest:
+                            previous[path] = manifest[path]
+            futures.append(pool.submit(export_chunk, chunk, output_dir, documents,
+                                       encodings, previous, brotli_quality))
+        for future in as_completed(futures):
+            for result in future.result():
+                if "error" in result:
+                    summary["failed"] += 1
+                    print(f"{result['store_id']}: {result['error']}", file=log)
+                    continue
+                summary["stores"] += 1
+                summary["files_written"] += result["written"]
+                summary["files_unchanged"] += result["unchanged"]
+                summary["bytes_written"] += result["bytes"]
+                manifest.update(result["entries"])
+    if summary["files_written"] or not os.path.exists(os.path.join(output_dir, MANIFEST)):
+        write_manifest(output_dir, manifest)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def add_arguments(parser):
+    parser.add_argument("input", help="CSV or JSONL file with one store per row/line")
+    parser.add_argument("-o", "--output", required=True, help="site directory")
+    add_record_arguments(parser, "export", kept="files")
+    add_pool_arguments(parser, "stores")
+    parser.add_argument("--encodings", default=",".join(ENCODINGS),
+                        help="comma-separated precompressed variants: gzip, br (default: both)")
+    parser.add_argument("--brotli-quality", type=int, default=BROTLI_QUALITY,
+                        help="0-11; 11 is the smallest but slowest (default: 11)")
+
+
+def main(args):
+    encodings = tuple(e.strip() for e in args.encodings.split(",") if e.strip())
+    unknown = set(encodings) - set(ENCODINGS)
+    if unknown:
+        raise SystemExit(f"Unknown encodings: {', '.join(sorted(unknown))}")
+    summary = run_export(
+        args.input, args.output,
+        documents=document_list(args.documents),
+        workers=args.workers, executor=args.executor, chunksize=args.chunksize,
+        input_format=args.format, last_updated=args.last_updated, locale=args.locale,
+        encodings=encodings, brotli_quality=args.brotli_quality,
+    )
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary["failed"] else 0
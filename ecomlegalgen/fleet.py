@@ -0,0 +1,309 @@
+"""Registry of stores and their issued documents, and fleet regeneration.
+
+    python -m ecomlegalgen regenerate --registry fleet.db --stores stores.csv -o out/
+    python -m ecomlegalgen regenerate --registry fleet.db -o out/
+
+The registry is an SQLite file holding every store's inputs and locale and,
+for every (store, document) pair, each issued version together with the
+template version it was rendered from, a digest of the inputs that template
+uses, the content digest and the section fingerprint (``diff.fingerprint``).
+
+``regenerate`` first adds or updates the stores of ``--stores`` (CSV or
+JSONL, as for ``bulk``), then re-renders only the pairs that are stale: never
+issued, rendered from an older template version, or whose store changed a
+field that document uses. Editing the terms template therefore touches every
+store's terms and nothing else. Stale pairs are rendered in a process pool
+and written to ``<output>/<store_id>/<document>.md``; each becomes a new
+version in the registry and a line in ``<output>/changes.jsonl`` with the
+sections that changed since the previous version, ready for a change notice.
+Content digests and fingerprints are taken of the document without its
+"Last Updated" date, so a re-render that differs only in that date is not a
+new version: its file is left alone and only the registry is updated.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import as_completed
+from datetime import date, datetime, timezone
+
+from ecomlegalgen.bulk import (
+    add_pool_arguments, add_record_arguments, check_documents, document_list, load_stores, make_pool)
+from ecomlegalgen.diff import SectionHash, diff_documents, fingerprint
+from ecomlegalgen.documents import DOCUMENTS
+from ecomlegalgen.locales import DEFAULT_LOCALE, format_date, get_locale
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stores (
+    store_id TEXT PRIMARY KEY,
+    inputs TEXT NOT NULL,
+    locale TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS issues (
+    store_id TEXT NOT NULL REFERENCES stores (store_id),
+    document TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    template_version TEXT NOT NULL,
+    inputs_digest TEXT NOT NULL,
+    content_digest TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    last_updated TEXT NOT NULL,
+    issued_at TEXT NOT NULL,
+    PRIMARY KEY (store_id, document, version)
+);
+"""
+
+Issue = namedtuple("Issue", "store_id document version template_version inputs_digest "
+                            "content_digest fingerprint last_updated issued_at")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def inputs_digest(template, inputs):
+    """Digest of the inputs ``template`` uses, apart from the date it is issued on."""
+    fields = [[field, inputs[field]] for field in sorted(template.fields) if field != "last_updated"]
+    return hashlib.sha256(json.dumps(fields, separators=(",", ":")).encode()).hexdigest()[:16]
+
+
+class Registry:
+    """The SQLite registry of stores and issued document versions."""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def upsert_store(self, store_id, inputs, locale=DEFAULT_LOCALE):
+        """Add or update a store; returns "added", "updated" or None if unchanged."""
+        inputs = json.dumps({k: v for k, v in inputs.items() if k != "last_updated"},
+                            sort_keys=True, ensure_ascii=False)
+        row = self._db.execute("SELECT inputs, locale FROM stores WHERE store_id = ?",
+                               (store_id,)).fetchone()
+        if row == (inputs, locale):
+            return None
+        with self._db:
+            self._db.execute(
+                "INSERT INTO stores (store_id, inputs, locale, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (store_id) DO UPDATE SET inputs = excluded.inputs, "
+                "locale = excluded.locale, updated_at = excluded.updated_at",
+                (store_id, inputs, locale, _now()))
+        return "added" if row is None else "updated"
+
+    def stores(self):
+        """Yield ``(store_id, inputs, locale)`` for every store."""
+        for store_id, inputs, locale in self._db.execute(
+                "SELECT store_id, inputs, locale FROM stores ORDER BY store_id"):
+            yield store_id, json.loads(inputs), locale
+
+    def current(self):
+        """``{(store_id, document): Issue}`` of the latest version of every pair."""
+        rows = self._db.execute(
+            "SELECT i.* FROM issues i JOIN (SELECT store_id, document, MAX(version) AS version "
+            "FROM issues GROUP BY store_id, document) latest USING (store_id, document, version)")
+        return {(row[0], row[1]): Issue(*row) for row in rows}
+
+    def record(self, results, previous):
+        """Record rendered ``results``; returns the version each one ended up as.
+
+        A result whose content matches the current version only moves that
+        version to the new template and inputs digests.
+        """
+        versions = []
+        with self._db:
+            for result in results:
+                key = (result["store_id"], result["document"])
+                issue = previous.get(key)
+                values = (result["template_version"], result["inputs_digest"])
+                if issue is not None and issue.content_digest == result["content_digest"]:
+                    self._db.execute(
+                        "UPDATE issues SET template_version = ?, inputs_digest = ? "
+                        "WHERE store_id = ? AND document = ? AND version = ?",
+                        values + key + (issue.version,))
+                    versions.append(None)
+                    continue
+                version = 1 if issue is None else issue.version + 1
+                self._db.execute(
+                    "INSERT INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    key + (version,) + values + (
+                        result["content_digest"], result["fingerprint"], result["last_updated"],
+                        _now()))
+                versions.append(version)
+        return versions
+
+    def stats(self):
+        stores, = self._db.execute("SELECT COUNT(*) FROM stores").fetchone()
+        issues, = self._db.execute("SELECT COUNT(*) FROM issues").fetchone()
+        return {"stores": stores, "issued_versions": issues}
+
+
+def stale_pairs(registry, documents=tuple(DOCUMENTS)):
+    """Pairs to re-render, and the current issues they were checked against.
+
+    Returns ``(stale, current)``: ``stale`` lists ``(store_id, document,
+    inputs, locale, reason)`` with ``reason`` "new", "template" or "inputs";
+    ``current`` is ``Registry.current()``.
+    """
+    current = registry.current()
+    templates = {}
+    stale = []
+    for store_id, inputs, locale in registry.stores():
+        for name in documents:
+            template = templates.get((locale, name))
+            if template is None:
+                template = templates[(locale, name)] = get_locale(locale).get(name)
+            issue = current.get((store_id, name))
+            if issue is None:
+                reason = "new"
+            elif issue.template_version != template.version:
+                reason = "template"
+            elif issue.inputs_digest != inputs_digest(template, inputs):
+                reason = "inputs"
+            else:
+                continue
+            stale.append((store_id, name, inputs, locale, reason))
+    return stale, current
+
+
+def regenerate_chunk(chunk, output_dir, issued_on):
+    """Render and write every ``(store_id, document, inputs, locale, previous)``.
+
+    ``previous`` is the current Issue of the pair, or None. Runs inside pool
+    workers; returns one result dict per pair.
+    """
+    results = []
+    for store_id, name, inputs, locale, previous in chunk:
+        result = {"store_id": store_id, "document": name}
+        try:
+            template = get_locale(locale).get(name)
+            # Digested and diffed without its date, which changes every day
+            undated = template.render(**dict(inputs, last_updated=""))
+            content_digest = hashlib.sha256(undated.encode()).hexdigest()
+            stamp = format_date(issued_on, locale)
+            result.update(
+                template_version=template.version,
+                inputs_digest=inputs_digest(template, inputs),
+                content_digest=content_digest,
+                last_updated=stamp)
+            if previous is not None and previous.content_digest == content_digest:
+                results.append(result)
+                continue
+            data = template.render(**dict(inputs, last_updated=stamp)).encode()
+            store_dir = os.path.join(output_dir, store_id)
+            os.makedirs(store_dir, exist_ok=True)
+            with open(os.path.join(store_dir, f"{name}.md"), "wb") as f:
+                f.write(data)
+            result.update(fingerprint=json.dumps(fingerprint(undated), ensure_ascii=False),
+                          bytes=len(data))
+            if previous is not None:
+                old = tuple(SectionHash(*section) for section in json.loads(previous.fingerprint))
+                result["summary"] = diff_documents(old, undated).summary()
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        results.append(result)
+    return results
+
+
+def add_stores(registry, input_path, input_format=None, locale=None, log=sys.stderr):
+    """Add or update the stores of a CSV/JSONL file; returns counts by outcome."""
+    counts = {"added": 0, "updated": 0, "unchanged": 0}
+    stores, counts["failed"] = load_stores(input_path, input_format, locale=locale, log=log)
+    for _, store_id, _, inputs, store_locale in stores:
+        outcome = registry.upsert_store(store_id, inputs, store_locale)
+        counts[outcome or "unchanged"] += 1
+    return counts
+
+
+def run_regenerate(registry_path, output_dir, documents=tuple(DOCUMENTS), stores_path=None,
+                   input_format=None, locale=None, workers=None, executor="process",
+                   chunksize=64, issued_on=None, dry_run=False, log=sys.stderr):
+    """Bring every issued document in the registry up to date; returns a summary dict."""
+    documents = check_documents(documents)
+    issued_on = issued_on or date.today()
+    started = time.perf_counter()
+
+    with Registry(registry_path) as registry:
+        summary = {}
+        if stores_path:
+            summary["store_updates"] = add_stores(registry, stores_path, input_format, locale, log)
+        stale, current = stale_pairs(registry, documents)
+        summary["stale"] = {}
+        for _, name, _, _, reason in stale:
+            counts = summary["stale"].setdefault(name, {})
+            counts[reason] = counts.get(reason, 0) + 1
+        summary.update(registry.stats(), rendered=0, new_versions=0, unchanged=0, failed=0)
+        if dry_run or not stale:
+            summary["seconds"] = round(time.perf_counter() - started, 3)
+            return summary
+
+        reasons = {(store_id, name): reason for store_id, name, _, _, reason in stale}
+        pairs = [(store_id, name, inputs, locale, current.get((store_id, name)))
+                 for store_id, name, inputs, locale, _ in stale]
+        chunks = [pairs[i:i + chunksize] for i in range(0, len(pairs), chunksize)]
+        os.makedirs(output_dir, exist_ok=True)
+        with make_pool(executor, workers) as pool, \
+                open(os.path.join(output_dir, "changes.jsonl"), "w", encoding="utf-8") as changes:
+            futures = [pool.submit(regenerate_chunk, chunk, output_dir, issued_on)
+                       for chunk in chunks]
+            for future in as_completed(futures):
+                results = future.result()
+                failed = [result for result in results if "error" in result]
+                rendered = [result for result in results if "error" not in result]
+                summary["failed"] += len(failed)
+                summary["rendered"] += len(rendered)
+                for result in failed:
+                    print(f"{result['store_id']}/{result['document']}: {result['error']}", file=log)
+                for result, version in zip(rendered, registry.record(rendered, current)):
+                    if version is None:
+                        summary["unchanged"] += 1
+                        continue
+                    summary["new_versions"] += 1
+                    key = (result["store_id"], result["document"])
+                    changes.write(json.dumps({
+                        "store_id": result["store_id"], "document": result["document"],
+                        "version": version, "reason": reasons[key],
+                        "template_version": result["template_version"],
+                        "summary": result.get("summary"),
+                    }, ensure_ascii=False) + "\n")
+        summary.update(registry.stats())
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def add_arguments(parser):
+    parser.add_argument("--registry", required=True, help="SQLite registry file (created if missing)")
+    parser.add_argument("-o", "--output", required=True,
+                        help="directory for re-rendered documents and changes.jsonl")
+    parser.add_argument("--stores", default=None,
+                        help="CSV or JSONL file of stores to add or update first")
+    add_record_arguments(parser, "check", records="--stores records", last_updated=False)
+    add_pool_arguments(parser, "store/document pairs")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only report which documents are stale")
+
+
+def main(args):
+    summary = run_regenerate(
+        args.registry, args.output,
+        documents=document_list(args.documents),
+        stores_path=args.stores, input_format=args.format, locale=args.locale,
+        workers=args.workers, executor=args.executor, chunksize=args.chunksize,
+        dry_run=args.dry_run,
+    )
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary["failed"] or summary.get("store_updates", {}).get("failed") else 0
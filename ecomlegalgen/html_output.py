@@ -0,0 +1,187 @@
+"""Server-side HTML output with the static parts converted once.
+
+The static Markdown of a template is converted to HTML a single time per
+template version (placeholders such as ``{company_name}`` pass through the
+converter untouched) and compiled into an HTML template. A request then
+only escapes its placeholder values and splices them in, without parsing
+any Markdown.
+
+The converter covers the Markdown the bundled templates use: ATX headings,
+paragraphs, ``**bold**``, ``*italic*``, links, ordered/bullet lists,
+pipe tables (with inline ``<br>``) and horizontal rules.
+"""
+
+import html
+import re
+from ecomlegalgen.documents import DOCUMENTS
+from ecomlegalgen.locales import get_locale
+from ecomlegalgen.templating import CompiledTemplate
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_RULE = re.compile(r"^\s{0,3}([-*_])(\s*\1){2,}\s*$")
+_ORDERED = re.compile(r"^\s{0,3}(\d+)[.)]\s+(.*)$")
+_BULLET = re.compile(r"^\s{0,3}[-*+]\s+(.*)$")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+_LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC = re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])")
+# Bare "&" that isn't already the start of an entity
+_AMPERSAND = re.compile(r"&(?!#?\w+;)")
+
+
+def _inline(text):
+    text = _AMPERSAND.sub("&amp;", text)
+    text = _LINK.sub(lambda m: f'<a href="{html.escape(m.group(2))}">{m.group(1)}</a>', text)
+    text = _BOLD.sub(r"<strong>\1</strong>", text)
+    return _ITALIC.sub(r"<em>\1</em>", text)
+
+
+def _table_cells(line):
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+
+def markdown_to_html(text):
+    lines = text.split("\n")
+    out = []
+    paragraph = []
+    list_tag = None
+    list_start = 1
+    list_items = []
+
+    def flush_paragraph():
+        if paragraph:
+            out.append(f"<p>{_inline(' '.join(line.strip() for line in paragraph))}</p>")
+            paragraph.clear()
+
+    def flush_list():
+        nonlocal list_tag, list_start
+        if list_tag:
+            items = "".join(f"<li>{_inline(' '.join(item))}</li>" for item in list_items)
+            start = f' start="{list_start}"' if list_tag == "ol" and list_start != 1 else ""
+            out.append(f"<{list_tag}{start}>{items}</{list_tag}>")
+            list_tag = None
+            list_start = 1
+            list_items.clear()
+
+    def next_content_line(i):
+        while i < len(lines) and not lines[i].strip():
+            i += 1
+        return lines[i] if i < len(lines) else ""
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        if not stripped:
+            flush_paragraph()
+            # A blank line only ends a list if the next block isn't another item
+            if list_tag:
+                following = next_content_line(i)
+                pattern = _ORDERED if list_tag == "ol" else _BULLET
+                if not pattern.match(following):
+                    flush_list()
+            i += 1
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            flush_paragraph()
+            flush_list()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+            i += 1
+            continue
+
+        if _RULE.match(line) and not paragraph:
+            flush_list()
+            out.append("<hr>")
+            i += 1
+            continue
+
+        if stripped.startswith("|") and i + 1 < len(lines) and _TABLE_SEPARATOR.match(lines[i + 1]):
+            flush_paragraph()
+            flush_list()
+            header = "".join(f"<th>{_inline(cell)}</th>" for cell in _table_cells(line))
+            rows = []
+            i += 2
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                cells = "".join(f"<td>{_inline(cell)}</td>" for cell in _table_cells(lines[i]))
+                rows.append(f"<tr>{cells}</tr>")
+                i += 1
+            out.append(f"<table><thead><tr>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table>")
+            continue
+
+        ordered = _ORDERED.match(line)
+        bullet = None if ordered else _BULLET.match(line)
+        if (ordered or bullet) and not paragraph:
+            tag = "ol" if ordered else "ul"
+            if list_tag != tag:
+                flush_list()
+                list_tag = tag
+            if ordered and not list_items:
+                list_start = int(ordered.group(1))
+            list_items.append([(ordered.group(2) if ordered else bullet.group(1)).strip()])
+            i += 1
+            continue
+
+        if list_tag and list_items and not paragraph:
+            # Lazy continuation of the current list item
+            list_items[-1].append(stripped)
+            i += 1
+            continue
+
+        paragraph.append(line)
+        i += 1
+
+    flush_paragraph()
+    flush_list()
+    return "\n".join(out)
+
+
+def compile_html_template(template):
+    """HTML version of a compiled Markdown template, built once per template version.
+
+    Each section is converted separately, so the HTML template has the same
+    sections as the Markdown one.
+    """
+    html_template = _html_templates.get(template.version)
+    if html_template is None:
+        html_template = CompiledTemplate(template.source, sections=[
+            (section.id, section.title, markdown_to_html(template.section_source(section)) + "\n")
+            for section in template.sections])
+        if len(_html_templates) >= 64:
+            _html_templates.pop(next(iter(_html_templates)))
+        _html_templates[template.version] = html_template
+    return html_template
+
+
+# Markdown template version -> compiled HTML template
+_html_templates = {}
+
+
+def render_html(name, inputs, sections=None, locale=None):
+    """The document ``name`` as an HTML fragment, with ``inputs`` HTML-escaped."""
+    html_template = compile_html_template(get_locale(locale).get(name))
+    values = {field: html.escape(str(inputs[field])) for field in html_template.fields}
+    if sections is None:
+        return html_template.render(**values)
+    return html_template.render_sections(sections, **values)
+
+
+def html_page(title, body, lang="en"):
+    """Wrap a rendered fragment in a minimal standalone page for static hosting."""
+    return (f'<!DOCTYPE html>\n<html lang="{lang}">\n<head>\n<meta charset="utf-8">\n'
+            f'<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+            f"<title>{html.escape(title)}</title>\n</head>\n<body>\n<main>\n{body}\n</main>\n"
+            f"</body>\n</html>\n")
+
+
+def render_html_page(name, inputs, sections=None, locale=None):
+    title = get_locale(locale).title(name, DOCUMENTS[name][0])
+    return html_page(title, render_html(name, inputs, sections, locale), get_locale(locale).code)
@@ -0,0 +1,95 @@
+"""Incremental re-rendering driven by a placeholder dependency index.
+
+``field_index()`` maps every input field to the documents that use it and
+the positions of its placeholder slots in each compiled template, e.g.
+``field_index()["jurisdiction"] == {"terms_conditions": (n,)}``. It is built
+once per set of template versions, so hot-reloaded templates are picked up,
+and each locale's templates get an index of their own. When a form is
+resubmitted, only documents that use a changed field are rendered again.
+"""
+
+from ecomlegalgen.documents import DOCUMENT_TEMPLATES, document_templates, render_document
+from ecomlegalgen.metrics import metrics
+from ecomlegalgen.templating import Placeholder
+
+
+def build_field_index(templates):
+    index = {}
+    for name, template in templates.items():
+        for position, segment in enumerate(template.segments):
+            if isinstance(segment, Placeholder):
+                index.setdefault(str(segment), {}).setdefault(name, []).append(position)
+    return {field: {name: tuple(positions) for name, positions in documents.items()}
+            for field, documents in index.items()}
+
+
+# Tuple of template versions -> field index
+_indexes = {}
+MAX_INDEXES = 32
+
+
+def field_index(templates=None):
+    templates = DOCUMENT_TEMPLATES if templates is None else templates
+    versions = tuple(template.version for template in templates.values())
+    index = _indexes.get(versions)
+    if index is None:
+        index = build_field_index(templates)
+        if len(_indexes) >= MAX_INDEXES:
+            _indexes.pop(next(iter(_indexes)))
+        _indexes[versions] = index
+    return index
+
+
+def changed_fields(old_inputs, new_inputs, templates=None):
+    return {field for field in field_index(templates)
+            if old_inputs.get(field) != new_inputs.get(field)}
+
+
+def affected_documents(old_inputs, new_inputs, documents=None, templates=None):
+    """Names of ``documents`` whose output differs between the two inputs."""
+    documents = DOCUMENT_TEMPLATES if documents is None else documents
+    index = field_index(templates)
+    affected = set()
+    for field in changed_fields(old_inputs, new_inputs, templates):
+        affected.update(index[field])
+    return {name for name in documents if name in affected}
+
+
+class IncrementalRenderer:
+    """Remembers the last rendered documents and re-renders only what changed.
+
+    A document is also rendered again when its template version changed
+    since it was rendered (a hot-reloaded template).
+    """
+
+    def __init__(self, render=render_document):
+        self._render = render
+        self.inputs = {}
+        self.sections = {}
+        self.locale = None
+        self.rendered = {}
+        self.versions = {}
+
+    def render(self, inputs, documents, sections=None, locale=None):
+        sections = sections or {}
+        if locale != self.locale:
+            # Another language: nothing rendered so far can be reused
+            self.rendered = {}
+        templates = document_templates(locale)
+        stale = affected_documents(self.inputs, inputs, documents, templates)
+        results, versions = {}, {}
+        for name in documents:
+            versions[name] = templates[name].version
+            if (name in self.rendered and name not in stale
+                    and versions[name] == self.versions.get(name)
+                    and sections.get(name) == self.sections.get(name)):
+                metrics.inc("documents_reused_total", document=name)
+                results[name] = self.rendered[name]
+            else:
+                results[name] = self._render(name, inputs, sections.get(name), locale)
+        self.inputs = dict(inputs)
+        self.sections = dict(sections)
+        self.locale = locale
+        self.rendered = results
+        self.versions = versions
+        return results
@@ -0,0 +1,182 @@
+"""Lazy, hot-reloading loader for the document template files.
+
+Templates are ``<name>.md`` files in a template directory (the bundled
+``templates/`` unless ``ECOMLEGALGEN_TEMPLATE_DIR`` is set). A template is
+read and compiled the first time it is requested. Compiled templates are
+also pickled into an artifact cache keyed by the file's SHA-256 and by a
+hash of ``templating.py`` (so a changed parser never loads stale pickles),
+and a restart or another worker only has to hash the file, not re-parse it.
+
+Every ``get`` at most once per ``check_interval`` seconds stats the file;
+when its mtime or size changed it is re-read and, if the content really
+differs, recompiled. Running servers therefore pick up legal edits without
+a restart. Since the compiled template's version is the content hash,
+caches keyed on it (render cache, HTML templates, document store) switch
+over automatically.
+
+A single trailing newline in a template file is ignored, so editors that
+add one don't change the output.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+
+from ecomlegalgen import templating
+from ecomlegalgen.templating import compile_template
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "ecomlegalgen", "templates")
+_code_digest = None
+
+
+def _templating_digest():
+    # Artifacts are only valid for the templating code that pickled them, so
+    # any change to its parser or classes must miss the old ones
+    global _code_digest
+    if _code_digest is None:
+        with open(templating.__file__, "rb") as f:
+            _code_digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    return _code_digest
+
+
+class TemplateNotFound(LookupError):
+    pass
+
+
+class TemplateLoader:
+    def __init__(self, directory=TEMPLATE_DIR, cache_dir=DEFAULT_CACHE_DIR, check_interval=1.0,
+                 timer=time.monotonic):
+        self.directory = os.path.abspath(directory)
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self._timer = timer
+        self._lock = threading.Lock()
+        # name -> (template, (mtime_ns, size), last check time)
+        self._loaded = {}
+        self.loads = 0
+        self.reloads = 0
+        self.artifact_hits = 0
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.md")
+
+    def names(self):
+        try:
+            return sorted(f[:-3] for f in os.listdir(self.directory) if f.endswith(".md"))
+        except FileNotFoundError:
+            return []
+
+    def get(self, name):
+        now = self._timer()
+        entry = self._loaded.get(name)
+        if entry is not None and now - entry[2] < self.check_interval:
+            return entry[0]
+
+        with self._lock:
+            entry = self._loaded.get(name)
+            try:
+                st = os.stat(self.path(name))
+            except FileNotFoundError:
+                if entry is not None:
+                    # Keep serving the last good version if the file vanishes mid-edit
+                    return entry[0]
+                raise TemplateNotFound(f"No template {name!r} in {self.directory}")
+            signature = (st.st_mtime_ns, st.st_size)
+            if entry is not None and entry[1] == signature:
+                self._loaded[name] = (entry[0], signature, now)
+                return entry[0]
+
+            template = self._load(name, previous=entry[0] if entry else None)
+            self._loaded[name] = (template, signature, now)
+            return template
+
+    def _load(self, name, previous=None):
+        with open(self.path(name), encoding="utf-8", newline="") as f:
+            source = f.read()
+        if source.endswith("\n"):
+            source = source[:-1]
+        digest = hashlib.sha256(source.encode()).hexdigest()
+        if previous is not None and previous.version == digest[:16]:
+            # Touched but unchanged
+            return previous
+
+        template = self._read_artifact(digest)
+        if template is None:
+            template = compile_template(source)
+            self._write_artifact(digest, template)
+        if previous is None:
+            self.loads += 1
+        else:
+            self.reloads += 1
+        return template
+
+    def _artifact_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.{_templating_digest()}.pickle")
+
+    def _read_artifact(self, digest):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._artifact_path(digest), "rb") as f:
+                template = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        self.artifact_hits += 1
+        return template
+
+    def _write_artifact(self, digest, template):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(template, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._artifact_path(digest))
+        except OSError:
+            # The artifact cache is only an optimization; a read-only or
+            # missing cache directory must not break rendering.
+            pass
+
+    def loaded(self):
+        return sorted(self._loaded)
+
+    def stats(self):
+        return {"directory": self.directory, "loaded": self.loaded(), "loads": self.loads,
+                "reloads": self.reloads, "artifact_hits": self.artifact_hits}
+
+
+class TemplateMapping(Mapping):
+    """Document name -> compiled template, loaded lazily through a TemplateLoader.
+
+    ``loader`` can be anything with a ``get(name)`` method, e.g. a Locale.
+    """
+
+    def __init__(self, loader, names):
+        self.loader = loader
+        self._names = tuple(names)
+
+    def __getitem__(self, name):
+        if name not in self._names:
+            raise KeyError(name)
+        return self.loader.get(name)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+default_loader = TemplateLoader(
+    os.environ.get("ECOMLEGALGEN_TEMPLATE_DIR") or TEMPLATE_DIR,
+    os.environ.get("ECOMLEGALGEN_TEMPLATE_CACHE", DEFAULT_CACHE_DIR),
+    float(os.environ.get("ECOMLEGALGEN_TEMPLATE_CHECK_INTERVAL", 1.0)),
+)
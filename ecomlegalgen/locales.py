@@ -0,0 +1,174 @@
+"""Locale packs: translated templates and date formats, loaded on first use.
+
+English is the template directory itself; every other locale is a
+subdirectory named after its code (``templates/hi/``) holding a
+``locale.json`` and the translated ``<document>.md`` files. A pack is only
+read when a locale is first requested, and its templates are compiled one
+by one as documents are rendered, so a worker that only ever renders
+English never touches the other packs.
+
+Each locale gets its own loader and its own bounded render cache
+(``ECOMLEGALGEN_LOCALE_CACHE_SIZE`` entries); English keeps using the
+shared ``document_cache``. A document missing from a pack falls back to
+the English template.
+
+``locale.json`` describes the pack::
+
+    {"name": "हिन्दी", "english_name": "Hindi",
+     "date_format": "{day} {month} {year}",
+     "months": ["जनवरी", ...],
+     "titles": {"refund_policy": "शिपिंग और वापसी नीति", ...}}
+
+``date_format`` is a ``str.format`` pattern over ``day``, ``month`` (the
+name from ``months``), ``month_number`` and ``year``.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import date
+
+from ecomlegalgen.cache import RenderCache, document_cache
+from ecomlegalgen.loader import TemplateLoader, TemplateNotFound, default_loader
+
+DEFAULT_LOCALE = "en"
+DEFAULT_LOCALE_CACHE_SIZE = 64
+LOCALE_FILE = "locale.json"
+
+# English is built in; its dates match the "%B %d, %Y" the documents have
+# always carried.
+ENGLISH = {
+    "name": "English",
+    "english_name": "English",
+    "date_format": "{month} {day:02d}, {year}",
+    "months": ["January", "February", "March", "April", "May", "June", "July",
+               "August", "September", "October", "November", "December"],
+    "titles": {},
+}
+
+
+class UnknownLocale(LookupError):
+    pass
+
+
+class Locale:
+    """One locale pack: its metadata, template loader and render cache."""
+
+    def __init__(self, code, meta, loader, cache, fallback=None):
+        self.code = code
+        self.name = meta.get("name", code)
+        self.english_name = meta.get("english_name", self.name)
+        self.date_format = meta.get("date_format", ENGLISH["date_format"])
+        self.months = meta.get("months", ENGLISH["months"])
+        self.titles = meta.get("titles", {})
+        self.loader = loader
+        self.cache = cache
+        self.fallback = fallback
+
+    def get(self, name):
+        """Compiled template of document ``name`` in this locale."""
+        try:
+            return self.loader.get(name)
+        except TemplateNotFound:
+            if self.fallback is None:
+                raise
+            return self.fallback.get(name)
+
+    def format_date(self, value=None):
+        value = date.today() if value is None else value
+        return self.date_format.format(
+            day=value.day, month=self.months[value.month - 1], month_number=value.month,
+            year=value.year)
+
+    def title(self, name, default=None):
+        return self.titles.get(name, default)
+
+    def __repr__(self):
+        return f"<Locale {self.code} ({self.english_name})>"
+
+
+_locales = {}
+_lock = threading.RLock()
+_CODE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def normalize_locale(code):
+    """``"hi_IN"`` -> ``"hi-in"``; None means the default locale.
+
+    Raises UnknownLocale for anything but a string, such as ``5`` from a
+    JSONL record.
+    """
+    if code is not None and not isinstance(code, str):
+        raise UnknownLocale(f"Locale code must be a string, not {code!r}")
+    return (code or DEFAULT_LOCALE).strip().lower().replace("_", "-")
+
+
+def get_locale(code=None):
+    """The Locale for ``code``, loading its pack on first use.
+
+    A regional code without a pack of its own (``hi-in``) uses the pack of
+    its language (``hi``). Raises UnknownLocale if there is neither.
+    """
+    code = normalize_locale(code)
+    locale = _locales.get(code)
+    if locale is not None:
+        return locale
+
+    with _lock:
+        locale = _locales.get(code)
+        if locale is None:
+            locale = _load_locale(code)
+            # Only real packs are remembered: aliases (hi-in, hi-xyz, ...) come
+            # from clients and would grow the dict without bound
+            if locale.code == code:
+                _locales[code] = locale
+        return locale
+
+
+def _pack_directory(code):
+    if not _CODE.fullmatch(code):
+        return None
+    directory = os.path.join(default_loader.directory, code)
+    return directory if os.path.isfile(os.path.join(directory, LOCALE_FILE)) else None
+
+
+def _load_locale(code):
+    if code == DEFAULT_LOCALE:
+        return Locale(DEFAULT_LOCALE, ENGLISH, default_loader, document_cache)
+
+    directory = _pack_directory(code)
+    if directory is None:
+        language = code.split("-")[0]
+        if language != code:
+            return get_locale(language)
+        raise UnknownLocale(f"No locale pack for {code!r}")
+
+    with open(os.path.join(directory, LOCALE_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    loader = TemplateLoader(directory, default_loader.cache_dir, default_loader.check_interval)
+    cache = RenderCache(
+        maxsize=int(os.environ.get("ECOMLEGALGEN_LOCALE_CACHE_SIZE", DEFAULT_LOCALE_CACHE_SIZE)),
+        ttl=document_cache.ttl)
+    return Locale(code, meta, loader, cache, fallback=get_locale(DEFAULT_LOCALE))
+
+
+def available_locales():
+    """Codes of the installed locale packs, English first. Nothing is loaded."""
+    root = default_loader.directory
+    try:
+        packs = sorted(entry for entry in os.listdir(root)
+                       if os.path.isfile(os.path.join(root, entry, LOCALE_FILE)))
+    except FileNotFoundError:
+        packs = []
+    return [DEFAULT_LOCALE] + [code for code in packs if code != DEFAULT_LOCALE]
+
+
+def loaded_locales():
+    return sorted(_locales)
+
+
+def format_date(value=None, locale=None):
+    """``value`` (default today) formatted the way ``locale`` writes dates."""
+    return get_locale(locale).format_date(value)
+
@@ -0,0 +1,151 @@
+"""Cheap hot-path instrumentation: per-stage timings and counters.
+
+Stages are timed with ``metrics.timer(stage, document)`` and aggregated
+into count/sum/max per (stage, document); counters are plain labelled
+totals. Both are process-wide and can be exported as Prometheus text
+(``to_prometheus``) or JSON (``snapshot``). Inside ``metrics.trace()``
+every timing is also collected for that one run (e.g. a Streamlit rerun)
+and, when ``ECOMLEGALGEN_METRICS_LOG`` names a file, appended to it as one
+JSON line.
+
+Recording costs a ``perf_counter`` pair and a dict update; set
+``ECOMLEGALGEN_METRICS=0`` to turn it off entirely.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from ecomlegalgen.cache import document_cache
+
+_current_trace = ContextVar("ecomlegalgen_trace", default=None)
+
+
+class Metrics:
+    def __init__(self, enabled=True, log_path=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        # (stage, document) -> [count, total seconds, max seconds]
+        self._timings = {}
+        # (name, sorted label items) -> value
+        self._counters = {}
+
+    def observe(self, stage, seconds, document=None):
+        if not self.enabled:
+            return
+        key = (stage, document)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                self._timings[key] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                if seconds > timing[2]:
+                    timing[2] = seconds
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append({"stage": stage, "document": document, "seconds": seconds})
+
+    @contextmanager
+    def timer(self, stage, document=None):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, document)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def trace(self):
+        """Collect the timings recorded in this context into a list of events."""
+        events = []
+        token = _current_trace.set(events)
+        try:
+            yield events
+        finally:
+            _current_trace.reset(token)
+            if self.enabled and self.log_path and events:
+                line = json.dumps({"time": time.time(), "events": events})
+                with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        with self._lock:
+            stages = [
+                {"stage": stage, "document": document, "count": count,
+                 "total_seconds": total, "mean_seconds": total / count, "max_seconds": max_}
+                for (stage, document), (count, total, max_) in sorted(
+                    self._timings.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+        return {"stages": stages, "counters": counters, "cache": document_cache.stats()}
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP ecomlegalgen_stage_seconds Time spent per processing stage.",
+            "# TYPE ecomlegalgen_stage_seconds summary",
+        ]
+        for s in snapshot["stages"]:
+            labels = _labels(stage=s["stage"], document=s["document"])
+            lines.append(f"ecomlegalgen_stage_seconds_count{labels} {s['count']}")
+            lines.append(f"ecomlegalgen_stage_seconds_sum{labels} {s['total_seconds']:.9f}")
+        lines += [
+            "# HELP ecomlegalgen_stage_seconds_max Slowest observation per processing stage.",
+            "# TYPE ecomlegalgen_stage_seconds_max gauge",
+        ]
+        for s in snapshot["stages"]:
+            labels = _labels(stage=s["stage"], document=s["document"])
+            lines.append(f"ecomlegalgen_stage_seconds_max{labels} {s['max_seconds']:.9f}")
+
+        seen = set()
+        for c in snapshot["counters"]:
+            name = f"ecomlegalgen_{c['name']}"
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(**c['labels'])} {c['value']}")
+
+        cache = snapshot["cache"]
+        for key in ("hits", "misses", "evictions", "expirations"):
+            lines.append(f"# TYPE ecomlegalgen_cache_{key}_total counter")
+            lines.append(f"ecomlegalgen_cache_{key}_total {cache[key]}")
+        lines.append("# TYPE ecomlegalgen_cache_size gauge")
+        lines.append(f"ecomlegalgen_cache_size {cache['size']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    items = [(k, v) for k, v in labels.items() if v is not None]
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+metrics = Metrics(
+    enabled=os.environ.get("ECOMLEGALGEN_METRICS", "1") != "0",
+    log_path=os.environ.get("ECOMLEGALGEN_METRICS_LOG") or None,
+)
@@ -0,0 +1,287 @@
+"""Asyncio HTTP service for rendering documents programmatically.
+
+    python -m ecomlegalgen serve --port 8080 --max-concurrency 64
+
+Endpoints (JSON request bodies use the same fields as bulk records):
+
+    GET  /health                 status, in-flight requests and cache stats
+    GET  /metrics                stage timings and counters, Prometheus text format
+    POST /documents/<document>   one rendered document as text/markdown, or as
+                                 HTML with ?format=html (&page=1 for a full page)
+    POST /bundle                 ZIP of ``documents`` (default: all)
+
+Both document endpoints accept an optional ``sections`` field: a list of
+section ids for ``/documents/<document>``, or an object mapping document
+names to lists of section ids for ``/bundle``; and an optional ``locale``
+(``"hi"``, ...) for translated documents.
+
+Connections are kept alive between requests. At most ``max_concurrency``
+requests are rendered at once; once ``max_pending`` requests are waiting,
+new ones are rejected with ``503`` and a ``Retry-After`` header instead of
+queueing without bound.
+"""
+
+import asyncio
+import json
+import sys
+from functools import partial
+from urllib.parse import parse_qs
+
+from ecomlegalgen import _http
+from ecomlegalgen._http import HTTPError
+from ecomlegalgen.bundle import bundle_bytes
+from ecomlegalgen.cache import document_cache
+from ecomlegalgen.documents import DOCUMENTS, render_document, section_ids
+from ecomlegalgen.html_output import render_html, render_html_page
+from ecomlegalgen.locales import UnknownLocale, format_date, get_locale, loaded_locales
+from ecomlegalgen.metrics import metrics
+from ecomlegalgen.validation import ValidationError, validate_inputs
+
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_MAX_PENDING = 256
+DEFAULT_MAX_BODY = 64 * 1024
+DEFAULT_KEEPALIVE_TIMEOUT = 15.0
+
+
+class DocumentServer:
+    def __init__(self, host="127.0.0.1", port=8080, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_pending=DEFAULT_MAX_PENDING, max_body=DEFAULT_MAX_BODY,
+                 keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.max_body = max_body
+        self.keepalive_timeout = keepalive_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._in_flight = 0
+        self._connections = set()
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # Report the real port when started with port 0
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Idle keep-alive connections would otherwise outlive the server
+        connections = list(self._connections)
+        for task in connections:
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        _http.read_request(reader, self.max_body), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as e:
+                    writer.write(_error_response(e, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                keep_alive = _http.keep_alive(request)
+                writer.write(await self._dispatch(request, keep_alive))
+                # Waits while the client isn't reading, which is the
+                # per-connection half of the backpressure
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    async def _dispatch(self, request, keep_alive):
+        if self._waiting >= self.max_pending:
+            return _http.encode_response(
+                503, _http.json_body({"error": "Server is overloaded, retry later"}),
+                "application/json", {"Retry-After": "1"}, keep_alive)
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            status, body, content_type, headers = await self._route(request)
+        except HTTPError as e:
+            return _error_response(e, keep_alive)
+        except Exception as e:
+            print(f"{request.method} {request.path}: {type(e).__name__}: {e}", file=sys.stderr)
+            return _error_response(HTTPError(500), keep_alive)
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+        return _http.encode_response(status, body, content_type, headers, keep_alive)
+
+    async def _route(self, request):
+        path = request.path.split("?", 1)[0]
+        if path == "/health":
+            _require_method(request, "GET")
+            return 200, _http.json_body(self.health()), "application/json", None
+
+        if path == "/metrics":
+            _require_method(request, "GET")
+            return 200, metrics.to_prometheus().encode(), "text/plain; version=0.0.4", None
+
+        if path.startswith("/documents/"):
+            _require_method(request, "POST")
+            name = path[len("/documents/"):]
+            if name not in DOCUMENTS:
+                raise HTTPError(404, f"Unknown document: {name}")
+            payload = _parse_json(request)
+            locale = _parse_locale(payload)
+            inputs = _parse_inputs(request, payload, locale)
+            sections = _parse_sections(name, payload.get("sections"), locale)
+            query = parse_qs(request.path.partition("?")[2])
+            # Rendering may compile or reload templates and read or write the
+            # document store, so it runs off the loop, under the semaphore
+            loop = asyncio.get_running_loop()
+            if query.get("format") == ["html"]:
+                render = render_html_page if query.get("page") == ["1"] else render_html
+                with metrics.timer("render_html", name):
+                    content = await loop.run_in_executor(None, render, name, inputs, sections, locale)
+                content_type = "text/html; charset=utf-8"
+            else:
+                content = await loop.run_in_executor(
+                    None, render_document, name, inputs, sections, locale)
+                content_type = "text/markdown; charset=utf-8"
+            body = content.encode()
+            metrics.inc("bytes_emitted_total", len(body), document=name, channel="http")
+            return 200, body, content_type, None
+
+        if path == "/bundle":
+            _require_method(request, "POST")
+            payload = _parse_json(request)
+            locale = _parse_locale(payload)
+            inputs = _parse_inputs(request, payload, locale)
+            documents = payload.get("documents") or list(DOCUMENTS)
+            if not isinstance(documents, list) or not all(isinstance(d, str) for d in documents):
+                raise HTTPError(400, "documents must be a list of document names")
+            unknown = [name for name in documents if name not in DOCUMENTS]
+            if unknown:
+                raise HTTPError(400, f"Unknown documents: {', '.join(unknown)}")
+            sections = payload.get("sections") or {}
+            if not isinstance(sections, dict):
+                raise HTTPError(400, "sections must map document names to section ids")
+            sections = {name: _parse_sections(name, ids, locale) for name, ids in sections.items()
+                        if name in documents}
+            # Compressing takes long enough to be worth moving off the loop
+            with metrics.timer("encode", "bundle"):
+                body = await asyncio.get_running_loop().run_in_executor(
+                    None, partial(bundle_bytes, inputs, documents, sections=sections, locale=locale))
+            metrics.inc("bytes_emitted_total", len(body), document="bundle", channel="http")
+            return 200, body, "application/zip", {
+                "Content-Disposition": 'attachment; filename="legal_documents.zip"'}
+
+        raise HTTPError(404)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "cache": document_cache.stats(),
+            "locales": loaded_locales(),
+        }
+
+
+def _require_method(request, method):
+    if request.method != method:
+        raise HTTPError(405)
+
+
+def _parse_json(request):
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError as e:
+        raise HTTPError(400, f"Invalid JSON: {e}")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Expected a JSON object")
+    return payload
+
+
+def _parse_locale(payload):
+    locale = payload.get("locale")
+    if locale is None:
+        return None
+    if not isinstance(locale, str):
+        raise HTTPError(400, "locale must be a string")
+    try:
+        return get_locale(locale).code
+    except UnknownLocale as e:
+        raise HTTPError(400, str(e))
+
+
+def _parse_inputs(request, payload=None, locale=None):
+    payload = _parse_json(request) if payload is None else payload
+    try:
+        return validate_inputs(payload, format_date(locale=locale))
+    except ValidationError as e:
+        raise HTTPError(400, str(e), {"fields": e.fields()})
+
+
+def _parse_sections(name, sections, locale=None):
+    if sections is None:
+        return None
+    if not isinstance(sections, list) or not all(isinstance(s, str) for s in sections):
+        raise HTTPError(400, "sections must be a list of section ids")
+    if not sections:
+        raise HTTPError(400, f"sections for {name} must include at least one section id")
+    unknown = set(sections).difference(section_ids(name, locale))
+    if unknown:
+        raise HTTPError(400, f"Unknown sections for {name}: {', '.join(sorted(unknown))}")
+    return sections
+
+
+def _error_response(error, keep_alive):
+    return _http.encode_response(
+        error.status, _http.json_body({"error": error.message, **error.details}), "application/json",
+        keep_alive=keep_alive)
+
+
+def add_arguments(parser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="requests rendered at the same time")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="requests allowed to wait before new ones get 503")
+    parser.add_argument("--keepalive-timeout", type=float, default=DEFAULT_KEEPALIVE_TIMEOUT)
+
+
+def main(args):
+    async def serve():
+        server = await DocumentServer(
+            args.host, args.port, max_concurrency=args.max_concurrency,
+            max_pending=args.max_pending, keepalive_timeout=args.keepalive_timeout).start()
+        print(f"Serving on http://{server.host}:{server.port}", file=sys.stderr, flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
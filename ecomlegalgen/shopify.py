@@ -0,0 +1,532 @@
+"""Publishing generated documents to Shopify stores as pages.
+
+    python -m ecomlegalgen publish stores.csv --concurrency 32
+    python -m ecomlegalgen publish stores.csv --mock
+
+Records are read as for ``bulk``, plus a ``shop`` field (``my-store`` or
+``my-store.myshopify.com``) and an optional ``access_token`` (default
+``ECOMLEGALGEN_SHOPIFY_TOKEN``). Every document is rendered to HTML and
+upserted through the REST Admin API as the page with its handle
+(``refund-policy``, ``privacy-policy``, ``terms-conditions``): looked up,
+then created, updated, or left alone if its body is already current. A
+default (today's) "Last Updated" date alone does not make a page stale, so
+republishing an unchanged fleet on a later day leaves every page alone.
+
+Stores are published ``concurrency`` at a time over a shared pool of
+keep-alive connections. Each store has its own token bucket matching
+Shopify's leaky bucket (40 calls, 2 per second leaked by default), kept in
+step with the ``X-Shopify-Shop-Api-Call-Limit`` header of every response,
+so a store is slowed down before it gets throttled rather than after.
+Throttled (429) requests wait out ``Retry-After``; server errors and
+dropped connections are retried with exponential backoff and full jitter.
+A create that failed ambiguously is never blindly resent: the upsert
+starts over from the lookup, so a page is not created twice.
+
+``--mock`` publishes to an in-process ``MockShopify`` instead, to test
+throughput and rate limiting offline.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+from ecomlegalgen import _http
+from ecomlegalgen.bulk import add_record_arguments, check_documents, document_list, load_stores
+from ecomlegalgen.documents import DOCUMENTS
+from ecomlegalgen.html_output import render_html
+from ecomlegalgen.locales import format_date, get_locale
+
+API_VERSION = "2024-10"
+DEFAULT_BUCKET_SIZE = 40
+DEFAULT_LEAK_RATE = 2.0
+DEFAULT_CONCURRENCY = 16
+DEFAULT_CONNECTIONS_PER_HOST = 4
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_TIMEOUT = 30.0
+# Full-jitter backoff: a random delay up to min(cap, base * 2**attempt)
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 10.0
+RETRY_STATUSES = frozenset((500, 502, 503, 504))
+IDEMPOTENT_METHODS = frozenset(("GET", "PUT", "DELETE"))
+# Rendered in place of a default date to find where the date goes
+_DATE_MARKER = "LastUpdatedDateMarker"
+
+
+class ShopifyError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}" if status else message)
+        self.status = status
+        self.message = message
+
+
+def page_handle(name):
+    return name.replace("_", "-")
+
+
+def shop_domain(shop):
+    """``"my-store"`` or ``"https://My-Store.myshopify.com/"`` -> ``"my-store.myshopify.com"``."""
+    shop = shop.strip().lower()
+    if "//" in shop:
+        shop = urlsplit(shop).hostname or shop
+    shop = shop.rstrip("/")
+    return shop if "." in shop else f"{shop}.myshopify.com"
+
+
+class TokenBucket:
+    """Client-side mirror of one store's API call bucket.
+
+    ``rate=None`` does no limiting of its own and only honours ``pause``.
+    """
+
+    def __init__(self, capacity=DEFAULT_BUCKET_SIZE, rate=DEFAULT_LEAK_RATE):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        # Calls sent but not yet answered, which a response's header can't count yet
+        self.in_flight = 0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if self.rate is None:
+                if now >= self._paused_until:
+                    self.in_flight += 1
+                    return
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            if now >= self._paused_until and self.tokens >= 1:
+                self.tokens -= 1
+                self.in_flight += 1
+                return
+            wait = max(self._paused_until - now, (1 - self.tokens) / self.rate)
+            await asyncio.sleep(wait)
+
+    def release(self):
+        """One call acquired earlier has been answered (or failed)."""
+        self.in_flight -= 1
+
+    def sync(self, header):
+        """Adopt the server's view from an ``X-Shopify-Shop-Api-Call-Limit: 12/40`` header.
+
+        Call it before ``release`` of the call the header came with.
+        """
+        used, _, limit = header.partition("/")
+        try:
+            used, limit = int(used), int(limit)
+        except ValueError:
+            return
+        if self.rate is None:
+            return
+        self._refill(time.monotonic())
+        self.capacity = limit
+        self.tokens = min(self.tokens, float(limit - used - (self.in_flight - 1)))
+
+    def pause(self, seconds):
+        """Hold every caller back for ``seconds``, after a 429."""
+        now = time.monotonic()
+        if self.rate is not None:
+            self._refill(now)
+            self.tokens = 0.0
+        self._paused_until = max(self._paused_until, now + seconds)
+
+
+class ConnectionPool:
+    """Keep-alive connections by ``(host, port, tls)``, at most ``limit_per_host`` each."""
+
+    def __init__(self, limit_per_host=DEFAULT_CONNECTIONS_PER_HOST):
+        self.limit_per_host = limit_per_host
+        self._idle = {}
+        self._limits = {}
+        self._ssl_context = None
+        self.opened = 0
+
+    async def acquire(self, address):
+        """``(reader, writer, reused)`` for ``address``; give it back with ``release``."""
+        limit = self._limits.get(address)
+        if limit is None:
+            limit = self._limits[address] = asyncio.Semaphore(self.limit_per_host)
+        await limit.acquire()
+        idle = self._idle.get(address)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        host, port, tls = address
+        try:
+            if tls and self._ssl_context is None:
+                import ssl
+                self._ssl_context = ssl.create_default_context()
+            reader, writer = await asyncio.open_connection(
+                host, port, ssl=self._ssl_context if tls else None)
+        except BaseException:
+            limit.release()
+            raise
+        self.opened += 1
+        return reader, writer, False
+
+    def release(self, address, reader, writer, reuse=True):
+        if reuse and not writer.is_closing():
+            self._idle.setdefault(address, []).append((reader, writer))
+        else:
+            writer.close()
+        self._limits[address].release()
+
+    async def close(self):
+        writers = [writer for connections in self._idle.values() for _, writer in connections]
+        self._idle.clear()
+        for writer in writers:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for writer in writers), return_exceptions=True)
+
+
+class ShopifyClient:
+    """REST Admin API client for one store."""
+
+    def __init__(self, shop, access_token, pool, endpoint=None, api_version=API_VERSION,
+                 bucket=None, max_retries=DEFAULT_MAX_RETRIES, timeout=DEFAULT_TIMEOUT,
+                 stats=None):
+        self.shop = shop_domain(shop)
+        self.access_token = access_token
+        self.pool = pool
+        if endpoint:
+            # e.g. a mock server, which tells stores apart by the Host header
+            parts = urlsplit(endpoint)
+            tls = parts.scheme == "https"
+            self.address = (parts.hostname, parts.port or (443 if tls else 80), tls)
+        else:
+            self.address = (self.shop, 443, True)
+        self.api_version = api_version
+        self.bucket = bucket or TokenBucket()
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.stats = stats if stats is not None else new_stats()
+
+    def _path(self, path):
+        return f"/admin/api/{self.api_version}/{path}"
+
+    async def _exchange(self, method, path, body):
+        request = _http.encode_request(method, path, self.shop, body, {
+            "X-Shopify-Access-Token": self.access_token,
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        })
+        while True:
+            reader, writer, reused = await self.pool.acquire(self.address)
+            reuse = False
+            try:
+                writer.write(request)
+                await writer.drain()
+                response = await _http.read_response(reader, method)
+                reuse = response.headers.get("connection", "").lower() != "close"
+                return response
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # A kept-alive connection the server had already closed: the
+                # request never reached it, so resend it on a fresh one
+                if not reused:
+                    raise
+            finally:
+                self.pool.release(self.address, reader, writer, reuse)
+
+    async def request(self, method, path, payload=None):
+        """Send one API call; returns the decoded JSON body, retrying what is safe to retry."""
+        body = b"" if payload is None else _http.json_body(payload)
+        path = self._path(path)
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            self.stats["requests"] += 1
+            try:
+                response = await asyncio.wait_for(self._exchange(method, path, body), self.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, _http.HTTPError) as e:
+                self.bucket.release()
+                # The request may have been processed; only idempotent ones are resent
+                if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+                    raise ShopifyError(None, f"{type(e).__name__}: {e}".rstrip(": "))
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            except BaseException:
+                self.bucket.release()
+                raise
+            limit = response.headers.get("x-shopify-shop-api-call-limit")
+            if limit:
+                self.bucket.sync(limit)
+            self.bucket.release()
+
+            if response.status == 429:
+                # Rejected before processing, so any method can be resent
+                self.stats["throttled"] += 1
+                try:
+                    retry_after = float(response.headers.get("retry-after", 2.0))
+                except ValueError:
+                    retry_after = 2.0
+                self.bucket.pause(retry_after + random.uniform(0, BACKOFF_BASE))
+                if attempt >= self.max_retries:
+                    raise ShopifyError(429, "Still throttled after retrying")
+                attempt += 1
+                self.stats["retries"] += 1
+                continue
+            if response.status in RETRY_STATUSES and method in IDEMPOTENT_METHODS \
+                    and attempt < self.max_retries:
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            if response.status >= 300:
+                raise ShopifyError(response.status, _error_message(response))
+            if not response.body:
+                return {}
+            try:
+                data = json.loads(response.body)
+            except ValueError:
+                raise ShopifyError(response.status, "Response is not JSON")
+            if not isinstance(data, dict):
+                raise ShopifyError(response.status, "Response is not a JSON object")
+            return data
+
+    async def find_page(self, handle):
+        data = await self.request(
+            "GET", f"pages.json?handle={quote(handle)}&fields=id,handle,title,body_html")
+        pages = data.get("pages")
+        if not isinstance(pages, list):
+            raise ShopifyError(None, "Response has no pages list")
+        for page in pages:
+            if isinstance(page, dict) and page.get("handle") == handle:
+                if "id" not in page:
+                    raise ShopifyError(None, f"Page {handle} has no id")
+                return page
+        return None
+
+    async def upsert_page(self, handle, title, body_html, current=None):
+        """Create or update the page ``handle``; returns ``(outcome, page_id)``.
+
+        An existing page is left alone if its title matches and its body is
+        ``body_html``, or fully matches the pattern ``current`` if given.
+        """
+        created = False
+        for attempt in range(self.max_retries + 1):
+            page = await self.find_page(handle)
+            if page is not None:
+                body = page.get("body_html")
+                if current is None:
+                    unchanged = body == body_html
+                else:
+                    unchanged = isinstance(body, str) and current.fullmatch(body) is not None
+                if unchanged and page.get("title") == title:
+                    # Possibly created by a POST whose response was lost
+                    return "created" if created else "unchanged", page["id"]
+                await self.request("PUT", f"pages/{page['id']}.json", {
+                    "page": {"id": page["id"], "title": title, "body_html": body_html}})
+                return "updated", page["id"]
+            try:
+                data = await self.request("POST", "pages.json", {"page": {
+                    "title": title, "handle": handle, "body_html": body_html, "published": True}})
+            except ShopifyError as e:
+                # Unknown whether the page was created: look it up again
+                if e.status is not None and e.status not in RETRY_STATUSES:
+                    raise
+                created = True
+                self.stats["retries"] += 1
+                await asyncio.sleep(_backoff(attempt + 1))
+                continue
+            page = data.get("page")
+            if not isinstance(page, dict) or "id" not in page:
+                raise ShopifyError(None, f"Created page {handle} has no id")
+            return "created", page["id"]
+        raise ShopifyError(None, f"Could not create page {handle}")
+
+
+def _backoff(attempt):
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _error_message(response):
+    try:
+        errors = json.loads(response.body).get("errors")
+    except (ValueError, AttributeError):
+        errors = None
+    if errors is None:
+        return response.body[:200].decode("utf-8", "replace") or "Request failed"
+    return errors if isinstance(errors, str) else json.dumps(errors, ensure_ascii=False)
+
+
+def undated_pattern(name, inputs, locale=None):
+    """A regex for the HTML of ``name`` with ``inputs`` and any "Last Updated" date."""
+    head, *rest = render_html(name, dict(inputs, last_updated=_DATE_MARKER),
+                              locale=locale).split(_DATE_MARKER)
+    if not rest:
+        return re.compile(re.escape(head))
+    # The same date wherever the template repeats it
+    return re.compile(re.escape(head) + "([^<]*)" + r"\1".join(map(re.escape, rest)))
+
+
+def new_stats():
+    return {"requests": 0, "throttled": 0, "retries": 0}
+
+
+def read_stores(input_path, input_format=None, last_updated=None, locale=None,
+                access_token=None, log=sys.stderr):
+    """``(jobs, failed)``: one ``(store_id, shop, token, inputs, locale)`` per valid record."""
+    stores, failed = load_stores(input_path, input_format, last_updated, locale, log)
+    jobs = []
+    for line, store_id, record, inputs, store_locale in stores:
+        try:
+            shop = (record.get("shop") or "").strip()
+            if not shop:
+                raise ValueError("shop: is required")
+            token = (record.get("access_token") or "").strip() or access_token
+            if not token:
+                raise ValueError("access_token: is required (or set ECOMLEGALGEN_SHOPIFY_TOKEN)")
+        except ValueError as e:
+            failed += 1
+            print(f"line {line}: {e}", file=log)
+            continue
+        jobs.append((store_id, shop_domain(shop), token, inputs, store_locale))
+    return jobs, failed
+
+
+async def publish_store(client, store_id, inputs, locale=None, documents=tuple(DOCUMENTS)):
+    """Upsert every document of one store; returns one result dict per document.
+
+    Without ``inputs["last_updated"]`` pages are dated today, but only
+    updated if something other than their date changed.
+    """
+    locale_pack = get_locale(locale)
+    dated = "last_updated" in inputs
+    if not dated:
+        undated, inputs = inputs, dict(inputs, last_updated=format_date(locale=locale))
+
+    async def publish(name):
+        result = {"store_id": store_id, "shop": client.shop, "document": name}
+        try:
+            title = locale_pack.title(name, DOCUMENTS[name][0])
+            body_html = render_html(name, inputs, locale=locale)
+            current = None if dated else undated_pattern(name, undated, locale)
+            result["outcome"], result["page_id"] = await client.upsert_page(
+                page_handle(name), title, body_html, current)
+        except ShopifyError as e:
+            result["error"] = str(e)
+        except Exception as e:
+            # Whatever else went wrong stays with this document, not the whole run
+            result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    return await asyncio.gather(*(publish(name) for name in documents))
+
+
+async def publish_all(jobs, documents=tuple(DOCUMENTS), endpoint=None,
+                      concurrency=DEFAULT_CONCURRENCY,
+                      connections_per_host=DEFAULT_CONNECTIONS_PER_HOST,
+                      bucket_size=DEFAULT_BUCKET_SIZE, leak_rate=DEFAULT_LEAK_RATE,
+                      max_retries=DEFAULT_MAX_RETRIES, api_version=API_VERSION,
+                      rate_limit=True, on_result=None):
+    """Publish ``jobs`` (as from ``read_stores``), ``concurrency`` stores at a time.
+
+    ``on_result`` is called with every document's result dict. Returns a
+    summary dict. ``rate_limit=False`` turns the client-side buckets off,
+    leaving only the server's 429s to slow stores down.
+    """
+    pool = ConnectionPool(connections_per_host)
+    stats = new_stats()
+    summary = {"stores": 0, "created": 0, "updated": 0, "unchanged": 0, "failed": 0}
+    jobs = iter(jobs)
+    started = time.perf_counter()
+
+    async def worker():
+        for store_id, shop, token, inputs, locale in jobs:
+            bucket = TokenBucket(bucket_size, leak_rate if rate_limit else None)
+            client = ShopifyClient(shop, token, pool, endpoint, api_version, bucket,
+                                   max_retries, stats=stats)
+            for result in await publish_store(client, store_id, inputs, locale, documents):
+                summary["failed" if "error" in result else result["outcome"]] += 1
+                if on_result is not None:
+                    on_result(result)
+            summary["stores"] += 1
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        await pool.close()
+    elapsed = time.perf_counter() - started
+    summary.update(stats, connections=pool.opened, seconds=round(elapsed, 3),
+                   requests_per_second=round(stats["requests"] / elapsed, 1) if elapsed else None)
+    return summary
+
+
+def add_arguments(parser):
+    parser.add_argument("input", help="CSV or JSONL file with one store per row/line, with a shop field")
+    add_record_arguments(parser, "publish", kept="pages")
+    parser.add_argument("--endpoint", default=None,
+                        help="send every store's calls here (e.g. http://127.0.0.1:9000) "
+                             "instead of https://<shop>")
+    parser.add_argument("--mock", action="store_true",
+                        help="publish to an in-process mock Shopify (offline testing)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="stores published at the same time")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS_PER_HOST,
+                        help="keep-alive connections per host")
+    parser.add_argument("--bucket-size", type=int, default=DEFAULT_BUCKET_SIZE,
+                        help="API calls a store may burst (default: 40, Shopify's standard)")
+    parser.add_argument("--leak-rate", type=float, default=DEFAULT_LEAK_RATE,
+                        help="API calls per second per store (default: 2)")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES)
+    parser.add_argument("--api-version", default=API_VERSION)
+    parser.add_argument("-o", "--output", default=None,
+                        help="write one JSON line per published document here")
+
+
+def main(args):
+    token = os.environ.get("ECOMLEGALGEN_SHOPIFY_TOKEN") or ("mock" if args.mock else None)
+    jobs, invalid = read_stores(args.input, args.format, args.last_updated, args.locale, token)
+    try:
+        documents = check_documents(document_list(args.documents))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+
+    def on_result(result):
+        if "error" in result:
+            print(f"{result['shop']}/{result['document']}: {result['error']}", file=sys.stderr)
+        if output:
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    async def run():
+        mock, endpoint = None, args.endpoint
+        if args.mock:
+            from ecomlegalgen.shopify_mock import MockShopify
+            mock = await MockShopify(port=0, bucket_size=args.bucket_size,
+                                     leak_rate=args.leak_rate).start()
+            endpoint = f"http://{mock.host}:{mock.port}"
+        try:
+            summary = await publish_all(
+                jobs, documents, endpoint, args.concurrency, args.connections, args.bucket_size,
+                args.leak_rate, args.max_retries, args.api_version, on_result=on_result)
+        finally:
+            if mock is not None:
+                await mock.close()
+        if mock is not None:
+            summary["mock"] = mock.stats()
+        return summary
+
+    try:
+        summary = asyncio.run(run())
+    finally:
+        if output:
+            output.close()
+    summary["invalid"] = invalid
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary["failed"] or invalid else 0
@@ -0,0 +1,229 @@
+"""In-process mock of the Shopify REST Admin API pages endpoints.
+
+Serves any number of stores from one port, told apart by the Host header,
+so ``ecomlegalgen.shopify`` can be exercised offline with ``--endpoint``
+(or ``publish --mock``). Implemented: ``GET pages.json?handle=&fields=``,
+``POST pages.json`` and ``GET``/``PUT pages/<id>.json``, access-token
+checks, and Shopify's per-store leaky bucket: ``bucket_size`` calls, leaking
+``leak_rate`` per second, reported in ``X-Shopify-Shop-Api-Call-Limit`` and
+answered with 429 plus ``Retry-After`` once full.
+
+``latency`` delays every response, and ``error_rate`` turns that share of
+requests into 500s, half of them after the request took effect (as a
+timed-out upstream would), so retries of non-idempotent calls are tested.
+A create for a handle that already exists gets a suffixed handle, as on
+Shopify; ``stats()["duplicate_pages"]`` counts them.
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from urllib.parse import parse_qs
+
+from ecomlegalgen import _http
+from ecomlegalgen._http import HTTPError
+
+_PAGES = re.compile(r"/admin/api/[\w-]+/pages(?:/(\d+))?\.json")
+
+
+class _Store:
+    __slots__ = ("level", "updated", "pages", "next_id", "calls")
+
+    def __init__(self):
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.pages = {}
+        self.next_id = 1
+        self.calls = 0
+
+
+class MockShopify:
+    def __init__(self, host="127.0.0.1", port=0, bucket_size=40, leak_rate=2.0, latency=0.0,
+                 error_rate=0.0, seed=0):
+        self.host = host
+        self.port = port
+        self.bucket_size = bucket_size
+        self.leak_rate = leak_rate
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._stores = {}
+        self._statuses = {}
+        self._duplicates = 0
+        self._peak_level = 0
+        self._connections = set()
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self, timeout=1.0):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Let connections the clients are closing finish, then drop the rest
+        if self._connections:
+            _, pending = await asyncio.wait(self._connections, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def store(self, shop):
+        """State of ``shop``, created on first use; ``.pages`` maps ids to pages."""
+        state = self._stores.get(shop)
+        if state is None:
+            state = self._stores[shop] = _Store()
+        return state
+
+    def stats(self):
+        return {
+            "stores": len(self._stores),
+            "pages": sum(len(state.pages) for state in self._stores.values()),
+            "requests": sum(self._statuses.values()),
+            "statuses": {str(status): n for status, n in sorted(self._statuses.items())},
+            "throttled": self._statuses.get(429, 0),
+            "duplicate_pages": self._duplicates,
+            "peak_bucket_level": self._peak_level,
+        }
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await _http.read_request(reader)
+                except HTTPError as e:
+                    writer.write(_json_response(e.status, {"errors": e.message}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                keep_alive = _http.keep_alive(request)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, payload, headers = self._respond(request)
+                self._statuses[status] = self._statuses.get(status, 0) + 1
+                writer.write(_json_response(status, payload, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    def _respond(self, request):
+        if not request.headers.get("x-shopify-access-token"):
+            return 401, {"errors": "[API] Invalid API key or access token "
+                                   "(unrecognized login or wrong password)"}, None
+        state = self.store(request.headers.get("host", "").partition(":")[0])
+
+        # The leaky bucket
+        now = time.monotonic()
+        state.level = max(0.0, state.level - (now - state.updated) * self.leak_rate)
+        state.updated = now
+        if state.level + 1 > self.bucket_size:
+            retry_after = (state.level + 1 - self.bucket_size) / self.leak_rate
+            return 429, {"errors": "Exceeded 2 calls per second for api client. "
+                                   "Reduce request rates to resume uninterrupted service."}, {
+                "Retry-After": f"{max(retry_after, 0.1):.1f}"}
+        state.level += 1
+        state.calls += 1
+        level = math.ceil(state.level)
+        self._peak_level = max(self._peak_level, level)
+        headers = {"X-Shopify-Shop-Api-Call-Limit": f"{level}/{self.bucket_size}"}
+
+        fail = self.error_rate and self._random.random() < self.error_rate
+        if fail and self._random.random() < 0.5:
+            return 500, {"errors": "Internal Server Error"}, headers
+        try:
+            status, payload = self._route(state, request)
+        except HTTPError as e:
+            status, payload = e.status, {"errors": e.message}
+        if fail:
+            # The change above has happened all the same
+            return 500, {"errors": "Internal Server Error"}, headers
+        return status, payload, headers
+
+    def _route(self, state, request):
+        path, _, query = request.path.partition("?")
+        match = _PAGES.fullmatch(path)
+        if match is None:
+            raise HTTPError(404, "Not Found")
+        page_id = match.group(1)
+        if page_id is None:
+            if request.method == "GET":
+                query = parse_qs(query)
+                handle = query.get("handle", [None])[0]
+                fields = query.get("fields", [""])[0].split(",")
+                pages = [page for page in state.pages.values()
+                         if handle is None or page["handle"] == handle]
+                if fields != [""]:
+                    pages = [{field: page[field] for field in fields if field in page}
+                             for page in pages]
+                return 200, {"pages": pages}
+            if request.method == "POST":
+                page = _page_payload(request)
+                if not page.get("title"):
+                    raise HTTPError(422, {"title": ["can't be blank"]})
+                handle = page.get("handle") or page["title"].lower().replace(" ", "-")
+                taken = {existing["handle"] for existing in state.pages.values()}
+                if handle in taken:
+                    self._duplicates += 1
+                    suffix = 1
+                    while f"{handle}-{suffix}" in taken:
+                        suffix += 1
+                    handle = f"{handle}-{suffix}"
+                page = {"id": state.next_id, "title": page["title"], "handle": handle,
+                        "body_html": page.get("body_html", ""),
+                        "published_at": _now() if page.get("published", True) else None,
+                        "updated_at": _now()}
+                state.pages[page["id"]] = page
+                state.next_id += 1
+                return 201, {"page": page}
+            raise HTTPError(405, "Method Not Allowed")
+
+        page = state.pages.get(int(page_id))
+        if page is None:
+            raise HTTPError(404, "Not Found")
+        if request.method == "GET":
+            return 200, {"page": page}
+        if request.method == "PUT":
+            changes = _page_payload(request)
+            for field in ("title", "handle", "body_html"):
+                if field in changes:
+                    page[field] = changes[field]
+            page["updated_at"] = _now()
+            return 200, {"page": page}
+        raise HTTPError(405, "Method Not Allowed")
+
+
+def _page_payload(request):
+    try:
+        page = json.loads(request.body or b"{}").get("page")
+    except (ValueError, AttributeError):
+        page = None
+    if not isinstance(page, dict):
+        raise HTTPError(400, "Expected a JSON object with a page")
+    return page
+
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+
+
+def _json_response(status, payload, headers=None, keep_alive=True):
+    return _http.encode_response(status, json.dumps(payload).encode(),
+                                 "application/json; charset=utf-8", headers, keep_alive)
@@ -0,0 +1,222 @@
+"""Content-addressed on-disk store for rendered documents.
+
+Layout under ``root``::
+
+    keys/<kk>/<key>      -> hex digest of the rendered content
+    blobs/<bb>/<digest>  -> the rendered document (UTF-8)
+
+A key hashes (template version, document name, the inputs the template
+uses); the blob name hashes the content itself, so identical documents
+reached through different keys are stored once. Every write goes to a
+temporary file that is then ``os.replace``-d into place, so readers (and
+concurrent worker processes) never see partial files. Reads are
+memory-mapped. Once the blobs exceed ``max_bytes``, the least recently
+used ones (by mtime, refreshed on every hit) are evicted, together with the
+keys that pointed at them.
+
+The store is enabled for ``render_document`` by pointing
+``ECOMLEGALGEN_STORE_DIR`` at a directory.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class DocumentStore:
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.deduplicated = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(name, template, inputs):
+        fields = [[field, inputs[field]] for field in sorted(template.fields)]
+        payload = json.dumps([template.version, name, fields], separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _key_path(self, key):
+        return os.path.join(self.root, "keys", key[:2], key)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def open(self, key):
+        """Return a read-only mmap of the stored document, or None on a miss.
+
+        The caller owns the map and should close it; an empty document is
+        returned as ``b""`` since empty files can't be mapped.
+        """
+        key_path = self._key_path(key)
+        digest = self._read_key(key_path)
+        if digest is None:
+            self.misses += 1
+            return None
+        path = self._blob_path(digest)
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        except FileNotFoundError:
+            # The blob was evicted; drop its key unless a writer just replaced it
+            if self._read_key(key_path) == digest:
+                try:
+                    os.unlink(key_path)
+                except FileNotFoundError:
+                    pass
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            # Mark as recently used for the LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    @staticmethod
+    def _read_key(path):
+        try:
+            with open(path, encoding="ascii") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def get(self, key):
+        data = self.open(key)
+        if data is None:
+            return None
+        if not data:
+            return ""
+        try:
+            with memoryview(data) as view:
+                return str(view, "utf-8")
+        finally:
+            data.close()
+
+    def put(self, key, content):
+        data = content.encode() if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        if os.path.exists(blob_path):
+            self.deduplicated += 1
+        else:
+            self._atomic_write(blob_path, data)
+            self.writes += 1
+            self._account(len(data))
+        self._atomic_write(self._key_path(key), digest.encode("ascii"))
+        return digest
+
+    def get_or_render(self, name, template, generate, **inputs):
+        key = self.make_key(name, template, inputs)
+        content = self.get(key)
+        if content is None:
+            content = generate(**inputs)
+            self.put(key, content)
+        return content
+
+    def _atomic_write(self, path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _blob_entries(self):
+        blobs = os.path.join(self.root, "blobs")
+        for dirpath, _, filenames in os.walk(blobs):
+            for filename in filenames:
+                if filename.startswith(".tmp-"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _account(self, added):
+        with self._lock:
+            if self._total_bytes is None:
+                # First write in this process: one scan to learn the size
+                self._total_bytes = sum(size for _, size, _ in self._blob_entries())
+            else:
+                self._total_bytes += added
+            if self.max_bytes and self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._blob_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+        self._sweep_keys()
+
+    def _sweep_keys(self):
+        # Keys of evicted blobs would otherwise stay behind forever
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, "keys")):
+            for filename in filenames:
+                if filename.startswith(".tmp-"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                digest = self._read_key(path)
+                if digest is not None and not os.path.exists(self._blob_path(digest)):
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+
+    def stats(self):
+        return {
+            "root": self.root,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "deduplicated": self.deduplicated,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_default_store = None
+
+
+def default_store():
+    """The store configured by ``ECOMLEGALGEN_STORE_DIR``, or None when unset."""
+    global _default_store
+    root = os.environ.get("ECOMLEGALGEN_STORE_DIR")
+    if not root:
+        return None
+    if _default_store is None or _default_store.root != os.path.abspath(root):
+        _default_store = DocumentStore(
+            root, int(os.environ.get("ECOMLEGALGEN_STORE_MAX_BYTES", DEFAULT_MAX_BYTES)))
+    return _default_store
@@ -0,0 +1,292 @@
+"""A tiny precompiled template engine for the legal document templates.
+
+Templates use the same ``{placeholder}`` syntax as ``str.format`` but are
+parsed only once, into a flat list of static chunks and placeholder slots.
+Rendering a compiled template is then a single ``"".join`` with no
+re-parsing of the (multi-KB) template text.
+
+Templates are also split into addressable sections at compile time: every
+heading line (``# Title`` or a line that is entirely ``**bold**``) starts
+a new section, and so does a ``<!-- section: Title -->`` marker line for
+clauses without a heading of their own (marker lines are not part of the
+output). Segments never straddle a section boundary, so a subset of
+sections is rendered by joining just their segments.
+
+``CompiledTemplate.document`` returns a ``Document``: the template plus a
+tuple of its substituted values, rendered only when it is turned into text
+or bytes. The static segments are shared by every document of a template,
+so holding many documents costs little more than their values.
+
+Section ids are slugs of the titles unless a marker gives one explicitly,
+as in ``<!-- section #returns: Title -->``. A marker directly above a
+heading line names that heading's section instead of starting another, so
+translated templates can keep the ids of the English sections with
+``<!-- section #returns -->``.
+"""
+
+import hashlib
+import re
+import sys
+from collections import namedtuple
+from string import Formatter
+
+_formatter = Formatter()
+
+# A newline followed by a section marker line, a "# Heading" line or a line
+# that is entirely **bold**
+_ANCHOR_LINE = re.compile(
+    r"\n(?:[ \t]*<!--[ \t]*section(?:[ \t]+#(?P<id>[A-Za-z0-9_-]+))?[ \t]*"
+    r"(?::[ \t]*(?P<title>.*?))?[ \t]*-->"
+    r"|#{1,6}[ \t]+(?P<heading>.+?)"
+    r"|\*\*(?P<bold>[^*\n].*?)\*\*)[ \t\r]*(?=\n|\Z)")
+
+_NON_SLUG = re.compile(r"[^a-z0-9]+")
+
+# A section covers ``segments[start:end]`` of its template
+Section = namedtuple("Section", "id title start end")
+
+
+class CompiledTemplate:
+    __slots__ = ("source", "version", "segments", "fields", "field_order", "sections",
+                 "section_index", "_parts", "_slots")
+
+    def __init__(self, source, sections=None):
+        """Compile ``source``, or ``sections`` (``(id, title, text)`` triples) if given.
+
+        ``source`` is always the text the version hash is computed from.
+        """
+        # Content hash of the template text; part of every cache key.
+        self.version = hashlib.sha256(source.encode()).hexdigest()[:16]
+        if sections is None:
+            sections = split_sections(source)
+
+        segments = []
+        index = []
+        for section_id, title, text in sections:
+            start = len(segments)
+            segments.extend(_parse(text))
+            index.append(Section(section_id, title, start, len(segments)))
+
+        self.source = "".join(text for _, _, text in sections)
+        self.segments = tuple(segments)
+        self.sections = tuple(index)
+        self.section_index = {section.id: section for section in index}
+        self.fields = frozenset(s for s in segments if isinstance(s, Placeholder))
+        # Order of the values of a Document
+        self.field_order = tuple(sorted(self.fields))
+        self._parts = [None if isinstance(s, Placeholder) else s for s in segments]
+        self._slots = tuple((i, str(s)) for i, s in enumerate(segments)
+                            if isinstance(s, Placeholder))
+
+    def render(self, **values):
+        parts = self._parts.copy()
+        for index, name in self._slots:
+            parts[index] = str(values[name])
+        return "".join(parts)
+
+    def render_sections(self, sections, **values):
+        """Render only the sections whose ids are in ``sections``, in template order."""
+        return "".join(self.iter_render(sections, **values))
+
+    def _selected_segments(self, sections):
+        if sections is None:
+            return self.segments
+        wanted = set(sections)
+        unknown = wanted.difference(self.section_index)
+        if unknown:
+            raise KeyError(f"Unknown sections: {', '.join(sorted(unknown))}")
+        return [segment for section in self.sections if section.id in wanted
+                for segment in self.segments[section.start:section.end]]
+
+    def iter_render(self, sections=None, **values):
+        """Lazily yield the rendered document chunk by chunk.
+
+        Static chunks are yielded as-is (no copies); only the substituted
+        values are converted, so the full document is never built.
+        ``sections`` optionally restricts the output to those section ids.
+        """
+        for segment in self._selected_segments(sections):
+            if isinstance(segment, Placeholder):
+                yield str(values[segment])
+            else:
+                yield segment
+
+    def write_to(self, stream, encoding="utf-8", sections=None, **values):
+        """Stream the rendered document into ``stream`` and return the size written.
+
+        ``stream`` is anything with a ``write`` method: a file, a zip entry
+        from ``ZipFile.open(name, "w")``, ``socket.makefile("wb")``... Chunks
+        are encoded with ``encoding`` unless it is None (for text streams).
+        """
+        written = 0
+        for chunk in self.iter_render(sections, **values):
+            if encoding is not None:
+                chunk = chunk.encode(encoding)
+            stream.write(chunk)
+            written += len(chunk)
+        return written
+
+    def document(self, sections=None, **values):
+        """A Document of this template with ``values``, rendered on demand."""
+        if sections is not None:
+            sections = tuple(sorted(set(sections)))
+            unknown = set(sections).difference(self.section_index)
+            if unknown:
+                raise KeyError(f"Unknown sections: {', '.join(sorted(unknown))}")
+            if len(sections) == len(self.sections):
+                sections = None
+        return Document(self, tuple(_intern(values[name]) for name in self.field_order), sections)
+
+    def section_source(self, section):
+        """Template text of one section, placeholders included."""
+        section = self.section_index[section] if isinstance(section, str) else section
+        return "".join(
+            "{" + segment + "}" if isinstance(segment, Placeholder)
+            else segment.replace("{", "{{").replace("}", "}}")
+            for segment in self.segments[section.start:section.end])
+
+    def __repr__(self):
+        return (f"<CompiledTemplate {len(self.segments)} segments, {len(self.sections)} sections, "
+                f"fields={sorted(self.fields)}>")
+
+
+class Document:
+    """A rendered document kept as its template and substituted values.
+
+    Only ``str()``, ``bytes()``, ``encode()`` and ``write_to()`` render
+    it; nothing is cached, so a Document stays a few hundred bytes however
+    large its text.
+    """
+
+    __slots__ = ("template", "values", "sections")
+
+    def __init__(self, template, values, sections=None):
+        self.template = template
+        self.values = values
+        self.sections = sections
+
+    @property
+    def inputs(self):
+        return dict(zip(self.template.field_order, self.values))
+
+    def __str__(self):
+        if self.sections is None:
+            return self.template.render(**self.inputs)
+        return self.template.render_sections(self.sections, **self.inputs)
+
+    def encode(self, encoding="utf-8"):
+        return str(self).encode(encoding)
+
+    def __bytes__(self):
+        return self.encode()
+
+    def write_to(self, stream, encoding="utf-8"):
+        return self.template.write_to(stream, encoding, self.sections, **self.inputs)
+
+    def __eq__(self, other):
+        if not isinstance(other, Document):
+            return NotImplemented
+        return (self.template.version == other.template.version and self.values == other.values
+                and self.sections == other.sections)
+
+    def __hash__(self):
+        return hash((self.template.version, self.values, self.sections))
+
+    def __repr__(self):
+        return f"<Document {self.template.version} {self.inputs!r}>"
+
+
+def _intern(value):
+    # The same jurisdiction, date or timeframe recurs across many stores
+    return sys.intern(value) if type(value) is str else value
+
+
+class Placeholder(str):
+    """Name of a placeholder slot inside a compiled template's segments."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"Placeholder({str.__repr__(self)})"
+
+
+def _parse(source):
+    # Segments alternate between static text (str) and placeholder names
+    # (Placeholder); adjacent static text is merged.
+    segments = []
+    for literal, field_name, format_spec, conversion in _formatter.parse(source):
+        if literal:
+            if segments and not isinstance(segments[-1], Placeholder):
+                segments[-1] += literal
+            else:
+                segments.append(literal)
+        if field_name is None:
+            continue
+        if not field_name.isidentifier() or format_spec or conversion:
+            raise ValueError(
+                f"Unsupported placeholder {{{field_name}}}: only plain names are allowed")
+        segments.append(Placeholder(field_name))
+    return segments
+
+
+def _slugify(title):
+    return _NON_SLUG.sub("-", title.lower()).strip("-") or "section"
+
+
+def split_sections(source):
+    """Split template text into ``(id, title, text)`` triples.
+
+    The texts concatenate back to ``source`` minus any marker lines.
+    """
+    sections = []
+    section_id, title, start, marked = None, None, 0, False
+
+    def close(end):
+        if end > start:
+            text = source[start:end]
+            heading = title or next(
+                (line.strip(" *#\n") for line in text.split("\n") if line.strip()), "")
+            sections.append((section_id, heading, text))
+
+    # Searching "\n" + source makes every line, the first one included, start
+    # after a newline; a match's offsets there are its line's offsets in source
+    for anchor in _ANCHOR_LINE.finditer("\n" + source):
+        line_start, line_end = anchor.start(), anchor.end() - 1
+        heading = anchor.group("heading") or anchor.group("bold")
+        if heading and marked and line_start == start:
+            # The marker above names this heading's section
+            title = title or heading.strip()
+            continue
+        close(line_start)
+        if heading:
+            section_id, title, marked = None, heading.strip(), False
+            start = line_start
+        else:
+            # Marker lines are not part of any section
+            section_id, title, marked = anchor.group("id"), anchor.group("title"), True
+            start = min(line_end + 1, len(source))
+    close(len(source))
+
+    seen = set()
+    for explicit_id, _, _ in sections:
+        if explicit_id is not None:
+            if explicit_id in seen:
+                raise ValueError(f"Duplicate section id: {explicit_id}")
+            seen.add(explicit_id)
+
+    result = []
+    for explicit_id, heading, text in sections:
+        section_id = explicit_id
+        if section_id is None:
+            base = section_id = _slugify(heading)
+            n = 1
+            while section_id in seen:
+                n += 1
+                section_id = f"{base}-{n}"
+            seen.add(section_id)
+        result.append((section_id, heading, text))
+    return result
+
+
+def compile_template(source):
+    return CompiledTemplate(source)
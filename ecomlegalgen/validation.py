@@ -0,0 +1,175 @@
+"""Validation of store inputs, shared by the app, bulk runs and the server.
+
+Every field has one validator, built once at import from precompiled
+patterns, that both checks and normalizes its value: surrounding
+whitespace is dropped, the website is reduced to its lower-cased domain
+(``https://Example.com/`` -> ``example.com``) and the refund timeframe
+becomes an int. Whatever passes is what gets rendered and cached, so
+equivalent submissions share one render-cache entry.
+
+Failures are reported per field as ``FieldError(field, code, message)``;
+``validate_inputs`` raises them as one ``ValidationError``.
+``validate_records`` checks a whole batch field by field, so each
+validator runs over a column of values instead of being looked up again
+for every record.
+"""
+
+import re
+from collections import namedtuple
+
+MIN_REFUND_TIMEFRAME = 1
+MAX_REFUND_TIMEFRAME = 365
+DEFAULT_REFUND_TIMEFRAME = 10
+
+FieldError = namedtuple("FieldError", "field code message")
+
+
+class ValidationError(ValueError):
+    def __init__(self, errors):
+        self.errors = tuple(errors)
+        super().__init__("; ".join(f"{error.field}: {error.message}" for error in self.errors))
+
+    def fields(self):
+        """``{field: message}``, the first error of each field."""
+        fields = {}
+        for error in self.errors:
+            fields.setdefault(error.field, error.message)
+        return fields
+
+
+class _Invalid:
+    # Preallocated per validator and failure, so rejecting a value allocates nothing
+    __slots__ = ("code", "message")
+
+    def __init__(self, code, message):
+        self.code = code
+        self.message = message
+
+
+_MISSING = _Invalid("required", "is required")
+_NOT_TEXT = _Invalid("type", "must be a string")
+_NOT_INTEGER = _Invalid("type", "must be a whole number of days")
+_OUT_OF_RANGE = _Invalid(
+    "out_of_range", f"must be between {MIN_REFUND_TIMEFRAME} and {MAX_REFUND_TIMEFRAME} days")
+
+# Control characters, and markup that would change how the document renders
+_UNSAFE = re.compile(r"[\x00-\x1f\x7f*`<>|\[\]{}]")
+_LETTER = re.compile(r"[^\W\d_]")
+# Any character but whitespace and ASCII punctuation, so that labels in other
+# scripts (with their combining vowel signs) are accepted too
+_LABEL_CHAR = r"[^\s!-/:-@\[-`{-~]"
+_LABEL = rf"{_LABEL_CHAR}(?:(?:{_LABEL_CHAR}|-){{0,61}}{_LABEL_CHAR})?"
+_DOMAIN = re.compile(rf"(?:{_LABEL}\.)+(?!\d+$){_LABEL}")
+_EMAIL = re.compile(rf"[A-Za-z0-9.!#$%&'+/=?^_~-]{{1,64}}@{_DOMAIN.pattern}")
+_SCHEME = re.compile(r"(?i)https?://")
+_INTEGER = re.compile(r"[+]?\d{1,6}")
+_NOT_A_PLACE = re.compile(r"[@/\\:;=#$%^~!?\"_+]")
+
+
+def _text(max_length, check=None, normalize=None, invalid=None):
+    too_long = _Invalid("too_long", f"must be at most {max_length} characters")
+    unsafe = _Invalid("invalid_characters", "must not contain control characters or * ` < > | [ ] { }")
+
+    def validate(value):
+        if not isinstance(value, str):
+            return _NOT_TEXT
+        value = value.strip()
+        if not value:
+            return _MISSING
+        if normalize is not None:
+            value = normalize(value)
+        if len(value) > max_length:
+            return too_long
+        if _UNSAFE.search(value):
+            return unsafe
+        if check is not None and not check(value):
+            return invalid
+        return value
+    return validate
+
+
+def normalize_domain(value):
+    """``"https://Example.com/"``, as copied from an address bar, -> ``"example.com"``."""
+    value = _SCHEME.sub("", value.strip(), count=1).lower()
+    return value[:-1] if value.endswith("/") else value
+
+
+def _jurisdiction(value):
+    # A place name: some letters, and none of the symbols of emails, URLs or paths
+    return _LETTER.search(value) is not None and _NOT_A_PLACE.search(value) is None
+
+
+def _refund_timeframe(value):
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return _MISSING
+        if not _INTEGER.fullmatch(value):
+            return _NOT_INTEGER
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif not isinstance(value, int) or isinstance(value, bool):
+        return _NOT_INTEGER
+    if not MIN_REFUND_TIMEFRAME <= value <= MAX_REFUND_TIMEFRAME:
+        return _OUT_OF_RANGE
+    return value
+
+
+_validate_email = _text(254, _EMAIL.fullmatch, invalid=_Invalid("invalid_email", "is not a valid email address"))
+
+# (field, validator, default); a default of _MISSING makes the field required
+# and None leaves it out of the inputs when it is empty
+VALIDATORS = (
+    ("company_name", _text(200), _MISSING),
+    ("company_contact_email", _validate_email, _MISSING),
+    ("privacy_compliance_email", _validate_email, _MISSING),
+    ("website_url", _text(253, _DOMAIN.fullmatch, normalize_domain, _Invalid(
+        "invalid_domain", "must be a domain like example.com, without a path")), _MISSING),
+    ("jurisdiction", _text(100, _jurisdiction, invalid=_Invalid(
+        "invalid_jurisdiction", "must be a place name like Dehradun, Uttarakhand")), _MISSING),
+    ("refund_timeframe", _refund_timeframe, DEFAULT_REFUND_TIMEFRAME),
+    ("last_updated", _text(100), None),
+)
+
+
+def validate_records(records, last_updated=None):
+    """Validate a batch of records in one pass.
+
+    Returns one ``(inputs, errors)`` pair per record: ``inputs`` is the
+    normalized dict (None if anything failed) and ``errors`` a tuple of
+    FieldErrors. ``last_updated`` fills in records without one.
+    """
+    records = records if isinstance(records, list) else list(records)
+    inputs = [{} for _ in records]
+    errors = [None] * len(records)
+    for name, validate, default in VALIDATORS:
+        if name == "last_updated" and last_updated is not None:
+            default = last_updated
+        column = [record.get(name) for record in records]
+        for index, value in enumerate([_MISSING if raw is None else validate(raw) for raw in column]):
+            if value is _MISSING and default is not _MISSING:
+                if default is None:
+                    continue
+                value = default
+            elif value.__class__ is _Invalid:
+                if errors[index] is None:
+                    errors[index] = []
+                errors[index].append(FieldError(name, value.code, value.message))
+                continue
+            inputs[index][name] = value
+    return [(None, tuple(found)) if found else (values, ())
+            for values, found in zip(inputs, errors)]
+
+
+def check_inputs(record, last_updated=None):
+    """``(inputs, errors)`` for one record; see ``validate_records``."""
+    return validate_records([record], last_updated)[0]
+
+
+def validate_inputs(record, last_updated=None):
+    """Normalized inputs for ``record``; raises ValidationError if any field is invalid."""
+    inputs, errors = check_inputs(record, last_updated)
+    if errors:
+        raise ValidationError(errors)
+    return inputs